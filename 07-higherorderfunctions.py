@@ -257,6 +257,10 @@ text='ZNLORABGGBBHFRSHY'
 rot13(text)
 rot13(rot13(text))
 
+# note: fun but quadratic (string + copies the result at every step), and
+# only correct for uppercase letters. See 07-xciphers.py for the practical
+# version using translation tables, which also works on (large) files.
+
 
 
 ################################
@@ -300,6 +304,9 @@ list(islice(numvalues,2,6))
 list(combinations('ABCD', 2))
 list(permutations('ABCD', 2))
 
+# (to start from the i-th combination, and split the work between several
+# processes, see the rank/unrank functions in 07-xcombinatorics.py)
+
 
 # also: Itertools Recipes @ https://docs.python.org/3/library/itertools.html
 
@@ -427,6 +434,8 @@ list(zip(*matrix))                  # same, using built-in functions!
 
 for a,b,c in zip(*matrix): print(a,b,c) # equivalent loop, shows as matrix
 
+# (for large matrices, see 07-xmatrices.py: transposing as a NumPy view)
+
 
 # Quick sort, functional programming style!
 def qsort(L):
@@ -473,6 +482,8 @@ i=i,Sx=Sx,F=lambda xc,yc,x,y,k,f=lambda xc,yc,x,y,k,f:(k<=0)or (x*x+y*y
 #        |____________________________ range on x axis
 """
 
+# (See 07-xfractals.py for a NumPy version that can render large images.)
+
 
 ##
 ##  END
@@ -0,0 +1,134 @@
+###############################################################################
+##
+##  PYTHON CIPHER DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 07 (Higher-Order Functions).
+## The rot13() example there builds its result with reduce() and string +,
+## which copies the partial string at every step i.e., O(n^2) overall, and
+## it also uppercases everything and garbles spaces, digits, punctuation.
+## Here the same ciphers are done the "batteries included" way, with a
+## translation table computed once and applied by str/bytes.translate().
+
+
+import os
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+
+# A translation table maps every character (code) to its replacement; it is
+# built once by maketrans(), then translate() applies it in a single C loop.
+# Characters not in the table (digits, spaces, etc.) are left untouched.
+
+def caesar_table(shift, binary=False):
+    """Returns a translation table rotating letters by shift positions."""
+    lower, upper = string.ascii_lowercase, string.ascii_uppercase
+    shift %= 26
+    src = lower + upper
+    dst = lower[shift:] + lower[:shift] + upper[shift:] + upper[:shift]
+    if binary:                      # bytes table: 256 bytes, for raw data
+        return bytes.maketrans(src.encode('ascii'), dst.encode('ascii'))
+    return str.maketrans(src, dst)  # str table: dict {ord(c): ord(d)}
+
+def substitution_table(key, alphabet=string.ascii_lowercase, binary=False):
+    """Returns a table for a simple substitution cipher given a key, i.e.
+    a permutation of the alphabet (case is preserved for ASCII letters)."""
+    if sorted(key) != sorted(alphabet):
+        raise ValueError("key must be a permutation of the alphabet")
+    src, dst = alphabet, key
+    if alphabet.islower():          # also map the uppercase counterparts
+        src, dst = src + src.upper(), dst + dst.upper()
+    if binary:
+        return bytes.maketrans(src.encode('latin-1'), dst.encode('latin-1'))
+    return str.maketrans(src, dst)
+
+def inverse_table(key, alphabet=string.ascii_lowercase, binary=False):
+    """Returns the decryption table of a substitution key."""
+    inverse = ''.join(alphabet[key.index(c)] for c in alphabet)
+    return substitution_table(inverse, alphabet, binary)
+
+
+def rot13(s):                       # compare with 07-higherorderfunctions!
+    return s.translate(ROT13)
+
+ROT13 = caesar_table(13)
+ROT13_BYTES = caesar_table(13, binary=True)
+
+
+# Since the ciphers work one byte at a time, a file can be processed in
+# large chunks, without decoding it to str nor loading it whole in memory.
+
+CHUNK_SIZE = 1 << 22                # 4 MB per read
+
+def translate_file(src, dst, table, chunk_size=CHUNK_SIZE):
+    """Applies a bytes translation table to a file, streaming it in chunks.
+    Returns the number of bytes processed."""
+    total = 0
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        while True:
+            chunk = fin.read(chunk_size)
+            if not chunk: break
+            fout.write(chunk.translate(table))
+            total += len(chunk)
+    return total
+
+def _translate_job(args):           # top-level, so that it can be pickled
+    return translate_file(*args)
+
+def translate_files(pairs, table, workers=None, chunk_size=CHUNK_SIZE):
+    """Applies a translation table to many (src, dst) files in parallel,
+    one file per worker process. Returns the list of byte counts."""
+    jobs = [(src, dst, table, chunk_size) for src, dst in pairs]
+    if len(jobs) < 2:               # no need for processes
+        return list(map(_translate_job, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_translate_job, jobs))
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    text = 'Why did the chicken cross the road? 42!'
+    print(rot13(text))              # non-letters and case are kept
+    print(rot13(rot13(text)) == text)
+
+    caesar3 = caesar_table(3)
+    print(text.translate(caesar3))  # Julius Caesar's own choice
+    print(text.translate(caesar3).translate(caesar_table(-3)))
+
+    key = 'qwertyuiopasdfghjklzxcvbnm'
+    secret = text.translate(substitution_table(key))
+    print(secret, '->', secret.translate(inverse_table(key)))
+
+    # bytes in, bytes out: works on any (ASCII-compatible) encoding as is
+    print(b'Hello, World!'.translate(ROT13_BYTES))
+
+    # compare with the reduce() version on a "large" string
+    from functools import reduce
+    from timeit import timeit
+    def rot13_reduce(s):
+        return reduce(lambda hold,nixt:
+                      hold+chr(((ord(nixt.upper())-65)+13)%26+65), s, '')
+    big = string.ascii_letters * 2000
+    print('reduce:   ', timeit(lambda: rot13_reduce(big), number=5))
+    print('translate:', timeit(lambda: rot13(big), number=5))
+
+    # file versions, on a few temporary files
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        pairs = []
+        for i in range(4):
+            src = os.path.join(tmp, 'log%d.txt' % i)
+            with open(src, 'wb') as f:
+                f.write(b'2018-01-01 INFO user logged in\n' * 100000)
+            pairs.append((src, src + '.rot13'))
+        print(translate_files(pairs, ROT13_BYTES))
+        with open(pairs[0][1], 'rb') as f:
+            print(f.readline())
+
+
+
+##
+##  END
+##
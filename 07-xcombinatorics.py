@@ -0,0 +1,227 @@
+###############################################################################
+##
+##  PYTHON COMBINATORICS DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 07 (Higher-Order Functions).
+## itertools.combinations() and permutations() generate their items in
+## lexicographic order, but always from the very first one. To split a huge
+## search space between several processes, each worker must be able to jump
+## straight to "the i-th combination". Here each item is given a number, its
+## rank (combinatorial number system for combinations, Lehmer code for
+## permutations), with functions to convert both ways and iterators that
+## start from any rank, in the same order as itertools. These only unrank at
+## the edges of their range: in between, all the items that share a prefix
+## form a block, e.g. (3, 5, x) for x in 6..n-1, which itertools generates
+## (in C) much faster than Python code computing each next item.
+
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import combinations, islice, permutations
+from math import comb, perm
+
+
+# Combinations of k among n, as tuples of indices (c0 < c1 < ... < ck-1).
+# There are comb(n-x-1, k-i-1) combinations that have x in position i and
+# the same prefix, so the rank is a sum of binomial coefficients.
+
+def rank_combination(c, n):
+    """Returns the rank of combination c (sorted indices) among comb(n,k)."""
+    k, r, prev = len(c), 0, -1
+    for i, ci in enumerate(c):
+        for x in range(prev + 1, ci):
+            r += comb(n - x - 1, k - i - 1)
+        prev = ci
+    return r
+
+def unrank_combination(r, n, k):
+    """Returns the combination (tuple of indices) of rank r."""
+    if not 0 <= r < comb(n, k):
+        raise IndexError("combination rank out of range")
+    c, x = [], 0
+    for i in range(k):
+        while True:
+            count = comb(n - x - 1, k - i - 1)
+            if r < count: break
+            r -= count
+            x += 1
+        c.append(x)
+        x += 1
+    return tuple(c)
+
+def combinations_from(pool, k, start=0, stop=None):
+    """Same as islice(combinations(pool, k), start, stop), without going
+    through the first start items."""
+    pool = tuple(pool)
+    n = len(pool)
+    stop = comb(n, k) if stop is None else min(stop, comb(n, k))
+    rank = start
+    while rank < stop:
+        c = unrank_combination(rank, n, k)
+        # largest block that starts here: the prefix c[:j] followed by all
+        # the combinations of k-j items after c[j-1], if it fits in the range
+        for j in range(k + 1):
+            low = c[j-1] + 1 if j else 0
+            size = comb(n - low, k - j)
+            if size <= stop - rank and c[j:] == tuple(range(low, low + k - j)):
+                break
+        prefix = tuple(pool[i] for i in c[:j])
+        yield from map(prefix.__add__, combinations(pool[low:], k - j))
+        rank += size
+
+
+# Permutations of r among n (partial permutations), as tuples of indices.
+# Each position is a digit in a mixed radix number: the index of the item
+# among the ones not used yet, weighted by perm(n-i-1, r-i-1).
+
+def rank_permutation(p, n):
+    """Returns the rank of permutation p (tuple of indices) among perm(n,r)."""
+    r, rank, available = len(p), 0, list(range(n))
+    for i, x in enumerate(p):
+        idx = available.index(x)
+        rank += idx * perm(n - i - 1, r - i - 1)
+        del available[idx]
+    return rank
+
+def unrank_permutation(rank, n, r=None):
+    """Returns the permutation (tuple of indices) of the given rank."""
+    r = n if r is None else r
+    if not 0 <= rank < perm(n, r):
+        raise IndexError("permutation rank out of range")
+    p, available = [], list(range(n))
+    for i in range(r):
+        idx, rank = divmod(rank, perm(n - i - 1, r - i - 1))
+        p.append(available.pop(idx))
+    return tuple(p)
+
+def permutations_from(pool, r=None, start=0, stop=None):
+    """Same as islice(permutations(pool, r), start, stop), without going
+    through the first start items."""
+    pool = tuple(pool)
+    n = len(pool)
+    r = n if r is None else r
+    stop = perm(n, r) if stop is None else min(stop, perm(n, r))
+    rank = start
+    while rank < stop:
+        p = unrank_permutation(rank, n, r)
+        # largest block that starts here: the prefix p[:j] followed by all
+        # the permutations of r-j of the unused items, if it fits
+        for j in range(r + 1):
+            unused = sorted(set(range(n)).difference(p[:j]))
+            size = perm(n - j, r - j)
+            if size <= stop - rank and list(p[j:]) == unused[:r - j]:
+                break
+        prefix = tuple(pool[i] for i in p[:j])
+        yield from map(prefix.__add__,
+                       permutations([pool[i] for i in unused], r - j))
+        rank += size
+
+
+# Parallel driver: cut the rank range [0, total) into contiguous shards;
+# each worker walks its own shard from its first rank, applies func to each
+# item, and folds the results with combine; the partial results are then
+# combined again in the main process, starting from initial (map-reduce,
+# see 07!). So initial is used once, as in reduce(combine, ..., initial).
+
+def shards(total, parts):
+    """Splits range(total) into parts contiguous (start, stop) ranges."""
+    size, extra = divmod(total, parts)
+    bounds = [0]
+    for i in range(parts):
+        bounds.append(bounds[-1] + size + (i < extra))
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+def _walk(job):                     # top-level, so that it can be pickled
+    kind, pool, k, start, stop, func, combine = job
+    items = (combinations_from(pool, k, start, stop) if kind == 'comb' else
+             permutations_from(pool, k, start, stop))
+    return reduce(combine, map(func, items))    # (shards are never empty)
+
+def parallel_search(func, combine, initial, pool, k, kind='comb',
+                    workers=4, shards_per_worker=4):
+    """Applies func to all combinations (kind='comb') or permutations
+    (kind='perm') of k items of pool, split over worker processes, and
+    returns the results folded with combine (func and combine must be
+    top-level functions, so that they can be sent to the workers)."""
+    pool = tuple(pool)
+    total = (comb if kind == 'comb' else perm)(len(pool), k)
+    jobs = [(kind, pool, k, a, b, func, combine)
+            for a, b in shards(total, workers * shards_per_worker)]
+    if workers == 1:
+        return reduce(combine, map(_walk, jobs), initial)
+    with ProcessPoolExecutor(max_workers=workers) as pool_:
+        return reduce(combine, pool_.map(_walk, jobs), initial)
+
+
+# Example of search: count the subsets of numbers that sum to a target
+def is_target_sum(items, target=100):
+    return int(sum(items) == target)
+
+def add(x, y):
+    return x + y
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    print([unrank_combination(i, 4, 2) for i in range(comb(4, 2))])
+    print(rank_combination((1, 3), 4)) # 4: AB AC AD BC [BD] CD
+    print(list(combinations_from('ABCD', 2, 3)))
+
+    print(unrank_permutation(10**6, 10)) # the millionth permutation, at once
+    print(list(permutations_from('ABCD', 2, 5, 8)))
+    print(list(islice(permutations('ABCD', 2), 5, 8)))
+
+    # check the orders are the same as itertools, on a few cases
+    for n, k in [(6, 0), (6, 3), (7, 7), (5, 1)]:
+        assert list(combinations_from(range(n), k)) == \
+               list(combinations(range(n), k))
+        assert list(permutations_from(range(n), k)) == \
+               list(permutations(range(n), k))
+        assert all(rank_combination(c, n) == i for i, c in
+                   enumerate(combinations(range(n), k)))
+        assert all(rank_permutation(p, n) == i for i, p in
+                   enumerate(permutations(range(n), k)))
+        for a, b in shards(comb(n, k), 7):
+            assert list(combinations_from(range(n), k, a, b)) == \
+                   list(islice(combinations(range(n), k), a, b))
+        for a, b in shards(perm(n, k), 7):
+            assert list(permutations_from(range(n), k, a, b)) == \
+                   list(islice(permutations(range(n), k), a, b))
+    print(parallel_search(is_target_sum, add, 10, range(1, 10), 3,
+                          workers=1))   # 10 + 0 found
+
+    # cost per item, in one shard: 200000 items from the middle of the range
+    from time import perf_counter
+    for name, func, ranked, total in [
+            ('combinations', combinations, combinations_from, comb(40, 5)),
+            ('permutations', permutations, permutations_from, perm(40, 5))]:
+        t = perf_counter()
+        for _ in islice(func(range(40), 5), 200000): pass
+        t_itertools = perf_counter() - t
+        start = total // 3
+        t = perf_counter()
+        for _ in ranked(range(40), 5, start, start + 200000): pass
+        print('%s_from: %.3fs for 200000 items, itertools: %.3fs' %
+              (name, perf_counter() - t, t_itertools))
+
+    # scaling benchmark: 5-subsets of 1..40 that sum to 100 (658008 items)
+    numbers = range(1, 41)
+    for workers in (1, 2, 4, 8):
+        t = perf_counter()
+        found = parallel_search(is_target_sum, add, 0, numbers, 5,
+                                workers=workers)
+        print('%d worker(s): %d found in %.2fs' %
+              (workers, found, perf_counter() - t))
+    t = perf_counter()
+    print('sequential itertools:',
+          sum(map(is_target_sum, combinations(numbers, 5))),
+          'in %.2fs' % (perf_counter() - t))
+
+
+
+##
+##  END
+##
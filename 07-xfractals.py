@@ -0,0 +1,255 @@
+###############################################################################
+##
+##  PYTHON FRACTALS DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This demo using NumPy is part of section 07 (Higher-Order Functions).
+## The Mandelbrot one-liner at the end of that section computes each pixel
+## with nested lambdas and recursion: nice puzzle, but way too slow for any
+## picture larger than a terminal. Here the same escape-time algorithm is
+## applied to whole arrays of points at once (vectorised), the image is cut
+## into tiles that are computed in separate processes, and tiles are cached
+## so that panning, or zooming back out, does not recompute what is known.
+## This file needs the numpy module to be installed.
+
+
+import math
+import struct
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# Escape time: iterate z = z*z + c and count the steps until |z| >= 2.
+# Mandelbrot: z starts at 0 and c is the point; Julia: z is the point and
+# c is a constant. Points that escaped are dropped from the working arrays
+# so that later iterations only compute the points still "alive".
+
+def escape_time(z, c, max_iter):
+    """Returns the number of iterations before each point of z escapes,
+    or max_iter if it never does (z, c: complex arrays of same shape)."""
+    counts = np.full(z.shape, max_iter, dtype=np.int32)
+    idx = np.arange(z.size)         # flat indices of points still alive
+    z, c = z.ravel().copy(), np.broadcast_to(c, counts.shape).ravel().copy()
+    flat = counts.ravel()
+    for k in range(max_iter):
+        z = z*z + c
+        escaped = (z.real*z.real + z.imag*z.imag) >= 4.0
+        if escaped.any():
+            flat[idx[escaped]] = k
+            alive = ~escaped        # mask out points that already escaped
+            idx, z, c = idx[alive], z[alive], c[alive]
+            if not idx.size: break
+    return counts
+
+def grid(xmin, xmax, ymin, ymax, width, height):
+    """Returns the complex plane points for each pixel of a width x height
+    image (row 0 at the top i.e., at ymax)."""
+    x = np.linspace(xmin, xmax, width, endpoint=False)
+    y = np.linspace(ymax, ymin, height, endpoint=False)
+    return x[np.newaxis, :] + 1j * y[:, np.newaxis]
+
+def mandelbrot(view, width, height, max_iter=100):
+    points = grid(*view, width, height)
+    return escape_time(np.zeros_like(points), points, max_iter)
+
+def julia(view, width, height, c=-0.8+0.156j, max_iter=100):
+    points = grid(*view, width, height)
+    return escape_time(points, c, max_iter)
+
+
+# Large images are split into tiles of TILE x TILE pixels. Each tile is an
+# independent job, so tiles can be computed by a pool of worker processes.
+# For tiles to be found again in the cache, they are laid on a fixed grid:
+# at zoom level L, pixels are squares of size scale / 2**L, and pixel (i, j)
+# is the point (i + j*1j) * size, i.e. integers times a power of two, always
+# the same floats. A tile is then identified by (level, ix, iy) integers,
+# plus the fractal parameters. Views are snapped to that grid: the level
+# whose pixel size is the nearest to the view's width / width is used, and
+# the image is centred on the view's centre. Panning, rendering again, and
+# zooming back out to a level already seen reuse the tiles in the cache.
+
+TILE = 128
+SCALE = 1 / 256                     # pixel size at level 0
+
+def _tile_job(args):                # top-level, so that it can be pickled
+    kind, level, ix, iy, tile, scale, c, max_iter = args
+    size = scale * 2.0 ** -level
+    x = (ix * tile + np.arange(tile)) * size
+    y = (iy * tile + tile - 1 - np.arange(tile)) * size     # top row first
+    points = x[np.newaxis, :] + 1j * y[:, np.newaxis]
+    if kind == 'julia':
+        return escape_time(points, c, max_iter)
+    return escape_time(np.zeros_like(points), points, max_iter)
+
+class FractalRenderer:
+    """Renders Mandelbrot/Julia images tile by tile, with a (LRU) tile
+    cache of at most cache_size tiles."""
+
+    def __init__(self, kind='mandelbrot', c=-0.8+0.156j, max_iter=100,
+                 tile=TILE, scale=SCALE, workers=None, cache_size=1024):
+        self.kind, self.c, self.max_iter = kind, c, max_iter
+        self.tile, self.scale, self.workers = tile, scale, workers
+        self.cache, self.cache_size = OrderedDict(), cache_size
+        self.hits = self.misses = 0
+
+    def snap(self, view, width, height):
+        """Returns the level, and the pixel indices of the left column and
+        of the top row, of the image nearest to view on the grid."""
+        xmin, xmax, ymin, ymax = view
+        level = round(math.log2(self.scale * width / (xmax - xmin)))
+        size = self.scale * 2.0 ** -level
+        left = round((xmin + xmax) / 2 / size - width / 2)
+        top = round((ymin + ymax) / 2 / size + height / 2) - 1
+        return level, left, top
+
+    def render(self, view, width, height):
+        """Returns the escape counts of the whole image as a 2D array."""
+        level, left, top = self.snap(view, width, height)
+        bottom, right, t = top - height + 1, left + width - 1, self.tile
+        tiles = [(ix, iy) for iy in range(top // t, bottom // t - 1, -1)
+                 for ix in range(left // t, right // t + 1)]
+        keys = {(ix, iy): (self.kind, level, ix, iy, t, self.scale, self.c,
+                           self.max_iter) for ix, iy in tiles}
+        found = {}                  # the tiles of this image: key -> counts
+        for key in keys.values():
+            if key in self.cache:
+                found[key] = self.cache[key]
+                self.cache.move_to_end(key)     # recently used
+        todo = [key for key in keys.values() if key not in found]
+        self.hits += len(found)
+        self.misses += len(todo)
+        if len(todo) > 1 and self.workers != 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_tile_job, todo))
+        else:
+            results = list(map(_tile_job, todo))
+        found.update(zip(todo, results))
+        self.cache.update(zip(todo, results))
+        while len(self.cache) > self.cache_size:  # least recently used first
+            self.cache.popitem(last=False)        # (not this image's, if any)
+        image = np.empty((height, width), dtype=np.int32)
+        for ix, iy in tiles:        # copy the part of each tile in the image
+            counts = found[keys[ix, iy]]
+            x0, x1 = max(ix * t, left), min(ix * t + t, right + 1)
+            y1, y0 = min(iy * t + t - 1, top), max(iy * t, bottom)
+            image[top - y1:top - y0 + 1, x0 - left:x1 - left] = \
+                counts[iy * t + t - 1 - y1:iy * t + t - y0, x0 - ix * t:
+                       x1 - ix * t]
+        return image
+
+    def zoom(self, center, view, factor, steps, width, height):
+        """Generates the images of a progressive zoom towards center."""
+        xmin, xmax, ymin, ymax = view
+        for _ in range(steps):
+            yield view, self.render(view, width, height)
+            hw, hh = (xmax - xmin) / 2 / factor, (ymax - ymin) / 2 / factor
+            xmin, xmax = center.real - hw, center.real + hw
+            ymin, ymax = center.imag - hh, center.imag + hh
+            view = (xmin, xmax, ymin, ymax)
+
+
+# Output formats: ASCII art (as in the one-liner), PGM (simplest grayscale
+# image format, text header + raw bytes), and PNG (written by hand with zlib
+# and struct, so that no imaging library is needed).
+
+def to_gray(counts, max_iter):
+    """Maps escape counts to 0..255 gray levels (inside the set = black)."""
+    g = (255 * np.sqrt(counts / max_iter)).astype(np.uint8)
+    g[counts >= max_iter] = 0
+    return g
+
+def to_ascii(counts, chars=' .:-=+*#%@'):
+    top = max(int(counts.max()), 1)
+    lut = np.array(list(chars))
+    levels = (counts * (len(chars) - 1) // top).clip(0, len(chars) - 1)
+    return '\n'.join(''.join(row) for row in lut[levels])
+
+def write_pgm(filename, gray):
+    height, width = gray.shape
+    with open(filename, 'wb') as f:
+        f.write(b'P5\n%d %d\n255\n' % (width, height))
+        f.write(np.ascontiguousarray(gray, dtype=np.uint8).tobytes())
+
+def write_png(filename, gray):
+    height, width = gray.shape
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+                struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+    rows = np.zeros((height, width + 1), dtype=np.uint8)
+    rows[:, 1:] = gray              # filter byte 0 (none) in front of rows
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                           8, 0, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    # same picture as the one-liner, 80x24 characters
+    print(to_ascii(mandelbrot((-2.1, 0.7, -1.2, 1.2), 80, 24, 30)))
+    print(to_ascii(julia((-1.6, 1.6, -1.0, 1.0), 80, 24)))
+
+    # a larger image, rendered by tiles in worker processes
+    import os
+    import tempfile
+    from time import perf_counter
+    renderer = FractalRenderer(max_iter=200)
+    view = (-2.1, 0.7, -1.2, 1.2)
+    t = perf_counter()
+    counts = renderer.render(view, 1024, 768)
+    print('1024x768 in %.2fs' % (perf_counter() - t))
+    folder = tempfile.mkdtemp()
+    write_pgm(os.path.join(folder, 'mandelbrot.pgm'),
+              to_gray(counts, renderer.max_iter))
+    write_png(os.path.join(folder, 'mandelbrot.png'),
+              to_gray(counts, renderer.max_iter))
+    print('images written in', folder)
+
+    t = perf_counter()
+    renderer.render(view, 1024, 768)  # second time: all tiles are cached
+    print('again in %.2fs' % (perf_counter() - t),
+          '(hits:', renderer.hits, 'misses:', renderer.misses, ')')
+
+    # panning by one tile (128 pixels) to the right: 1 column of new tiles
+    size = renderer.scale * 2.0 ** -renderer.snap(view, 1024, 768)[0]
+    hits, misses = renderer.hits, renderer.misses
+    panned = (view[0] + 128*size, view[1] + 128*size, view[2], view[3])
+    moved = renderer.render(panned, 1024, 768)
+    assert (moved[:, :-128] == counts[:, 128:]).all()  # same pixels, moved
+    print('panned: hits', renderer.hits - hits,
+          'misses', renderer.misses - misses)
+
+    # progressive zoom towards a point on the border of the set, by levels
+    # (x2), then back out: the way out is all in the cache
+    center = -0.743643+0.131825j
+    views = []
+    for v, img in renderer.zoom(center, view, 2, 5, 320, 240):
+        views.append(v)
+        print(v, renderer.hits, renderer.misses)
+    print(to_ascii(renderer.render(views[-1], 80, 24)))
+    hits, misses = renderer.hits, renderer.misses
+    for v in reversed(views):
+        renderer.render(v, 320, 240)
+    print('zooming out: hits', renderer.hits - hits,
+          'misses', renderer.misses - misses)
+
+    # a cache too small for one image: still bounded, and still correct
+    small = FractalRenderer(workers=1, cache_size=4, max_iter=20)
+    image = small.render(view, 256, 256)
+    size = small.scale * 2.0 ** -small.snap(view, 256, 256)[0]
+    panned = (view[0] + 128*size, view[1] + 128*size, view[2], view[3])
+    assert (small.render(panned, 256, 256)[:, :-128] == image[:, 128:]).all()
+    assert len(small.cache) <= small.cache_size
+
+
+
+##
+##  END
+##
@@ -0,0 +1,113 @@
+###############################################################################
+##
+##  PYTHON MATRICES DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This demo using NumPy is part of section 07 (Higher-Order Functions).
+## Lists of lists are fine for small matrices, and zip(*matrix) is a neat
+## transpose, but it creates a new tuple for every row and touches every
+## element through the interpreter. For large matrices (e.g., read from a
+## CSV file) it is better to copy the data once into a contiguous array,
+## then transpose by merely changing how the array is viewed (strides).
+## This file needs the numpy module to be installed.
+
+
+import csv
+import numpy as np
+
+
+class Matrix:
+    """A 2D matrix stored once in a contiguous (row-major) NumPy array."""
+
+    def __init__(self, rows, dtype=float):
+        self.data = np.ascontiguousarray(rows, dtype=dtype)
+        if self.data.ndim != 2:
+            raise ValueError("matrix must be 2-dimensional")
+
+    @classmethod
+    def from_csv(cls, filename, dtype=float, delimiter=','):
+        with open(filename, newline='') as f:
+            return cls(list(csv.reader(f, delimiter=delimiter)), dtype)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __repr__(self):
+        return 'Matrix(%s)' % self.data.tolist()
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def tolist(self):
+        return self.data.tolist()
+
+    # Transpose as a view: no data is copied, only the strides are swapped,
+    # so element [i,j] of the view is element [j,i] of the original. O(1)!
+    @property
+    def T(self):
+        m = Matrix.__new__(Matrix)
+        m.data = self.data.T
+        return m
+
+    # When the transpose must be stored row-major (e.g., to export it, or to
+    # pass it to code expecting contiguous rows), copy it block by block:
+    # each block of the source and of the destination fits in the CPU cache,
+    # whereas a naive copy reads one of the two a column at a time.
+    def transposed_copy(self, block=64):
+        src = self.data
+        rows, cols = src.shape
+        dst = np.empty((cols, rows), dtype=src.dtype)
+        for i in range(0, rows, block):
+            for j in range(0, cols, block):
+                dst[j:j+block, i:i+block] = src[i:i+block, j:j+block].T
+        return Matrix(dst, dtype=dst.dtype)
+
+    # Reductions along rows (axis=1) or columns (axis=0), all done in C
+    def row_sums(self):   return self.data.sum(axis=1)
+    def col_sums(self):   return self.data.sum(axis=0)
+    def row_means(self):  return self.data.mean(axis=1)
+    def col_means(self):  return self.data.mean(axis=0)
+    def row_max(self):    return self.data.max(axis=1)
+    def col_max(self):    return self.data.max(axis=0)
+    def row_min(self):    return self.data.min(axis=1)
+    def col_min(self):    return self.data.min(axis=0)
+
+    def to_csv(self, filename, delimiter=',', fmt='%.18g'):
+        np.savetxt(filename, np.ascontiguousarray(self.data),
+                   delimiter=delimiter, fmt=fmt)
+
+
+
+if __name__ == '__main__':
+
+    matrix = [ [1, 2,  3,  4],
+               [5, 6,  7,  8],
+               [9, 10, 11, 12] ]
+    m = Matrix(matrix, dtype=int)
+    print(m.T.tolist())             # same as list(zip(*matrix))
+    print(m.T.data.base is m.data)  # True: the transpose is a view
+    print(m.transposed_copy(block=2).tolist())
+    print(m.row_sums(), m.col_sums())
+
+    # benchmarks, on a 2000 x 2000 list of lists
+    from timeit import timeit
+    n = 2000
+    big = [[float(i*n + j) for j in range(n)] for i in range(n)]
+    bm = Matrix(big)
+    print('zip(*m):        ', timeit(lambda: list(zip(*big)), number=3))
+    print('comprehension:  ', timeit(lambda: [[row[i] for row in big]
+                                              for i in range(n)], number=3))
+    print('view .T:        ', timeit(lambda: bm.T, number=3))
+    print('np .T.copy():   ', timeit(lambda: bm.data.T.copy(), number=3))
+    print('blocked copy:   ', timeit(lambda: bm.transposed_copy(), number=3))
+    print('col sums (zip): ', timeit(lambda: [sum(c) for c in zip(*big)],
+                                     number=3))
+    print('col sums (np):  ', timeit(lambda: bm.col_sums(), number=3))
+
+
+
+##
+##  END
+##
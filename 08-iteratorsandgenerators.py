@@ -155,6 +155,9 @@ for card in deck.cards: print(card, end=' ')
 # the shorter and more intuitive: "for every card in the deck ..."!
 for card in deck: print(card, end=' ')
 
+# (For simulations dealing millions of hands, see 08-xcards.py, where cards
+# are small integers in NumPy arrays and Card/Deck are only used to print.)
+
 
 
 ################################
@@ -223,6 +226,9 @@ list( islice(fibiter, 0, 10))       # isslice iterator calls next()
 # The state of the iterator (Fib object) is fully kept inside prev and curr
 # instance variables. Every call to next() does two things: modify its state
 # (for the following next() call) and return the result of the current call.
+#
+# (To jump straight to the n-th item without calling next() n times, see
+# 08-xlazysequences.py: seekable sequences supporting seq[n] and slices.)
 
 
 
@@ -299,6 +305,9 @@ def take(n, seq):
 
 print( take(10, squares()))
 
+# (simpler: list(islice(seq, n)); and to process items by chunks rather than
+# one at a time, see chunked() and batched_map() in 08-xbatching.py)
+
 
 
 ################################
@@ -329,6 +338,8 @@ squares = (n**2 for n in numbers)   # iterator created
 next(squares)                       # first square value returned
 list(squares)                       # explicit list exhaustively generated
 for n in squares: print(n, end=' ') # all values generated and printed
+# (nothing printed: the iterator was already exhausted by list() above; to
+# go over the same items several times, see Replay in 08-xtee.py)
 
 # Equivalent generator function
 def squares_of(numbers):
@@ -367,6 +378,11 @@ sum(n**2 for n in numbers)
 # all traversal operations as iterators! (default being in-order traversal)
 
 
+# Note that in a chain of generators, producer and consumer take turns: when
+# the producer waits (e.g., on I/O) the consumer waits too. See prefetch() in
+# 08-xprefetch.py to run the producer ahead, in a background thread.
+
+
 # Rule of thumb: whenever you have (imperative style) code similar to the
 # following LoopingFunction, replace it with IterFunction:
 #
@@ -0,0 +1,116 @@
+###############################################################################
+##
+##  PYTHON BATCHING DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 08 (Iterators and Generators).
+## Chains of generators such as squares_of(numbers) are elegant, but every
+## item goes through every stage one at a time: one next() call and one
+## generator resumption per item per stage, plus a Python-level function
+## call when the stage applies a function. Handling items by chunks (lists
+## or, with numpy, arrays) pays these costs once per chunk instead, and
+## lets each stage process the whole chunk with fast built-ins.
+## The array examples need the numpy module; everything else is plain Python.
+
+
+from itertools import chain, islice
+
+try:
+    import numpy as np
+except ImportError:                 # arrays are optional
+    np = None
+
+
+def take(n, seq):
+    """returns first n values from a given sequence / iterable"""
+    return list(islice(seq, n))     # same as section 08, without next()
+
+def chunked(iterable, n, array=False, dtype=float):
+    """Yields successive chunks of n items (the last one may be shorter),
+    as lists, or as numpy arrays of the given dtype if array is true."""
+    it = iter(iterable)
+    if array and np is None:
+        raise ImportError("chunked(..., array=True) requires numpy")
+    while True:
+        if array:                   # no intermediate list
+            chunk = np.fromiter(islice(it, n), dtype=dtype)
+            if not chunk.size: return
+        else:
+            chunk = list(islice(it, n))
+            if not chunk: return
+        yield chunk
+
+def batched_map(func, chunks):
+    """Applies func to each whole chunk: func must take a chunk (list or
+    array) and return a chunk of results (vectorised function)."""
+    return map(func, chunks)
+
+def unchunk(chunks):
+    """Flattens a stream of chunks back into a stream of items."""
+    return chain.from_iterable(chunks)
+
+
+# Chunk functions for the usual stages (list versions, then array versions)
+def squares_chunk(chunk):
+    return [n * n for n in chunk]
+
+def evens_chunk(chunk):
+    return [n for n in chunk if not n % 2]
+
+def squares_array(chunk):
+    return chunk * chunk
+
+def evens_array(chunk):
+    return chunk[chunk % 2 == 0]
+
+
+
+if __name__ == '__main__':
+
+    print(take(5, range(100)))
+    print(list(chunked(range(10), 4)))
+    print(list(unchunk(batched_map(squares_chunk, chunked(range(10), 4)))))
+
+    # Microbenchmarks: sum of the even squares of the first N integers
+    from timeit import timeit
+    N, SIZE = 1000000, 4096
+
+    def squares_of(numbers):        # section 08 style, item at a time
+        for n in numbers:
+            yield n**2
+    def evens_of(numbers):
+        for n in numbers:
+            if not n % 2: yield n
+
+    def item_chain():
+        return sum(evens_of(squares_of(range(N))))
+    def list_chunks():
+        return sum(unchunk(batched_map(evens_chunk,
+                   batched_map(squares_chunk, chunked(range(N), SIZE)))))
+    def list_chunks_sum():          # reduce each chunk too
+        return sum(map(sum, batched_map(evens_chunk,
+                   batched_map(squares_chunk, chunked(range(N), SIZE)))))
+
+    assert item_chain() == list_chunks() == list_chunks_sum()
+    print('item at a time:   ', timeit(item_chain, number=3))
+    print('list chunks:      ', timeit(list_chunks, number=3))
+    print('list chunks, sum: ', timeit(list_chunks_sum, number=3))
+
+    if np is not None:
+        def array_chunks():
+            chunks = chunked(range(N), SIZE, array=True, dtype=np.int64)
+            return int(sum(c.sum() for c in batched_map(evens_array,
+                           batched_map(squares_array, chunks))))
+        def array_whole():          # no chunks: the limit, memory allowing
+            a = np.arange(N, dtype=np.int64)
+            return int(evens_array(squares_array(a)).sum())
+        assert array_chunks() == array_whole() == item_chain()
+        print('array chunks:     ', timeit(array_chunks, number=3))
+        print('array, no chunks: ', timeit(array_whole, number=3))
+
+
+
+##
+##  END
+##
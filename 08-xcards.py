@@ -0,0 +1,151 @@
+###############################################################################
+##
+##  PYTHON CARD GAMES DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This demo using NumPy is part of section 08 (Iterators and Generators).
+## The Card and Deck classes in that section are nice to print and iterate
+## over, but each card is a full object holding two strings. To simulate
+## millions of deals, a card is better encoded as a small integer (0..51),
+## a deck as an array of 52 bytes, and many decks as a 2D array that can be
+## shuffled and evaluated all at once. Card and Deck remain, to view them.
+## This file needs the numpy module to be installed.
+
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+# Same classes as in section 08, built from the compact int codes instead
+class Card(object):
+    FACE = {11: 'J', 12: 'Q', 13: 'K'}
+    def __init__(self, rank, suit):
+        self.suit = suit
+        self.rank = rank if rank <=10 else Card.FACE[rank]
+    def __str__(self):
+        return "%s%s" % (self.rank, self.suit) # 1S or 4D or QH ...
+
+    @staticmethod
+    def from_code(code):            # code = suit * 13 + rank - 1
+        suit, rank = divmod(int(code), 13)
+        return Card(rank + 1, Deck.SUITS[suit])
+
+class Deck(object):
+    SUITS = ['S', 'D', 'C', 'H']
+    def __init__(self, codes=None): # list of 52 cards, or the given ones
+        if codes is None: codes = range(52)
+        self.cards = [Card.from_code(c) for c in codes]
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __str__(self):
+        return ' '.join(map(str, self.cards))
+
+
+# Compact encoding: card code = suit * 13 + (rank - 1), stored as uint8
+DECK = np.arange(52, dtype=np.uint8)
+
+def ranks(cards):                   # 0 (ace) .. 12 (king)
+    return cards % 13
+
+def suits(cards):                   # 0..3 i.e., S D C H
+    return cards // 13
+
+def shuffled_decks(n, rng):
+    """Returns n independently shuffled decks, as a (n, 52) array."""
+    return rng.permuted(np.broadcast_to(DECK, (n, 52)), axis=1)
+
+
+# Poker hand evaluation (5 cards), vectorised over many hands at once.
+# Lookup tables replace all the tests: STRAIGHT tells whether a set of ranks
+# (as a 13-bit mask) is a straight, and CATEGORY gives the hand category
+# from the two largest counts of equal ranks (e.g., 3 and 2: full house).
+
+HANDS = ['high card', 'pair', 'two pairs', 'three of a kind', 'straight',
+         'flush', 'full house', 'four of a kind', 'straight flush']
+
+def _straight_table():
+    table = np.zeros(1 << 13, dtype=bool)
+    for low in range(9):            # A2345 .. 9TJQK
+        table[0b11111 << low] = True
+    table[0b1111000000001] = True   # TJQKA (ace high)
+    return table
+
+STRAIGHT = _straight_table()
+
+CATEGORY = np.zeros((5, 5), dtype=np.int8) # [largest count, second count]
+CATEGORY[2, 1], CATEGORY[2, 2] = 1, 2
+CATEGORY[3, 1], CATEGORY[3, 2] = 3, 6
+CATEGORY[4, 1] = 7
+
+def evaluate(hands):
+    """Returns the category (index in HANDS) of each 5-card hand, given
+    as a (n, 5) array of card codes."""
+    r, s = ranks(hands), suits(hands)
+    counts = np.zeros((len(hands), 13), dtype=np.int8)
+    np.add.at(counts, (np.arange(len(hands))[:, None], r), 1)
+    top2 = -np.sort(-counts, axis=1)[:, :2]
+    category = CATEGORY[top2[:, 0], top2[:, 1]]
+    masks = (counts > 0).astype(np.int32) @ (1 << np.arange(13))
+    straight = STRAIGHT[masks] & (top2[:, 0] == 1)
+    flush = (s == s[:, :1]).all(axis=1)
+    category = np.where(straight, 4, category)
+    category = np.where(flush, 5, category)
+    category = np.where(straight & flush, 8, category)
+    return category
+
+
+# Monte-Carlo simulation: deal many 5-card hands and count the categories.
+# Each worker process gets its own random stream, spawned from one seed, so
+# that the streams are independent and the whole run is reproducible.
+
+def _simulate(args):                # top-level, so that it can be pickled
+    seed, n, batch = args
+    rng = np.random.default_rng(seed)
+    totals = np.zeros(len(HANDS), dtype=np.int64)
+    for done in range(0, n, batch):
+        decks = shuffled_decks(min(batch, n - done), rng)
+        totals += np.bincount(evaluate(decks[:, :5]), minlength=len(HANDS))
+    return totals
+
+def simulate(n, seed=2018, workers=4, batch=100000):
+    """Deals n poker hands over worker processes; returns the frequency
+    of each hand category (as a dict)."""
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [n // workers + (i < n % workers) for i in range(workers)]
+    jobs = [(s, k, batch) for s, k in zip(seeds, sizes)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        totals = sum(pool.map(_simulate, jobs))
+    return {hand: total / n for hand, total in zip(HANDS, totals)}
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    rng = np.random.default_rng(1)
+    decks = shuffled_decks(3, rng)  # 3 decks, 52 bytes each
+    print(decks.nbytes, 'bytes')
+    for d in decks:
+        print(Deck(d))              # printable view of each deck
+
+    hands = np.array([[0, 1, 2, 3, 4],          # A2345 spades: str. flush
+                      [0, 13, 26, 1, 14],       # AAA22: full house
+                      [9, 23, 37, 51, 0],       # TJQK + A: straight
+                      [0, 13, 2, 15, 30]],      # AA33 5: two pairs
+                     dtype=np.uint8)
+    for h, c in zip(hands, evaluate(hands)):
+        print(Deck(h), '->', HANDS[c])
+
+    from time import perf_counter
+    t = perf_counter()
+    for hand, freq in simulate(2000000).items():
+        print('%-16s %.6f' % (hand, freq))
+    print('2M hands in %.2fs' % (perf_counter() - t))
+
+
+
+##
+##  END
+##
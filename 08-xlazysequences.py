@@ -0,0 +1,153 @@
+###############################################################################
+##
+##  PYTHON LAZY SEQUENCES DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 08 (Iterators and Generators).
+## The lazy sequences in that section (Fib, fib, integers, squares) can only
+## move forward one item at a time: islice(fibiter, 10**6, 10**6+10) must
+## call next() a million times before returning anything. Yet many of them
+## have a closed form (squares), or a fast way to jump ahead (Fibonacci by
+## "fast doubling", in O(log n) steps). Others can at least remember where
+## they have been, and restart from the nearest saved state (checkpoint).
+## Below, all three kinds support seq[n] and seq[a:b:c] without computing
+## the items before a, and iterating as usual.
+
+
+from bisect import bisect_right
+from itertools import count, islice
+
+
+class LazySequence:
+    """Base class for infinite sequences indexed from 0. Subclasses must
+    implement item(n); they may implement iter_from(start) to iterate
+    faster than calling item() for every index."""
+
+    def item(self, n):
+        raise NotImplementedError
+
+    def iter_from(self, start):
+        return map(self.item, count(start))
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            if start < 0 or (stop is not None and stop < 0) or step < 1:
+                raise IndexError("infinite sequence: no negative indices")
+            items = self.iter_from(start)  # does not compute the prefix
+            if stop is None:               # infinite slice: lazy
+                return islice(items, 0, None, step)
+            return list(islice(items, 0, max(stop - start, 0), step))
+        if index < 0:
+            raise IndexError("infinite sequence: no negative indices")
+        return self.item(index)
+
+
+# Sequences with a closed form: item(n) is computed directly, in O(1)
+class ClosedForm(LazySequence):
+    def __init__(self, formula):
+        self.formula = formula
+    def item(self, n):
+        return self.formula(n)
+
+integers = ClosedForm(lambda n: n)
+squares = ClosedForm(lambda n: n * n)
+
+
+# Fibonacci numbers by fast doubling: F(2k) = F(k) * (2F(k+1) - F(k)) and
+# F(2k+1) = F(k)^2 + F(k+1)^2, so F(n) takes O(log n) steps. Indexed like
+# Fib() in section 08, which starts at 1 1 2 3 5... i.e., fib[n] = F(n+1).
+class Fibonacci(LazySequence):
+    @staticmethod
+    def pair(n):
+        """Returns (F(n), F(n+1))."""
+        a, b = 0, 1
+        for bit in bin(n)[2:]:      # from the most significant bit
+            a, b = a * (2*b - a), a*a + b*b
+            if bit == '1':
+                a, b = b, a + b
+        return a, b
+
+    def item(self, n):
+        return self.pair(n + 1)[0]
+
+    def iter_from(self, start):     # jump to start, then add as usual
+        prev, curr = self.pair(start)
+        while True:
+            yield curr
+            prev, curr = curr, prev + curr
+
+
+# Sequences without a closed form are defined by an initial state, a step
+# function (state -> next state) and a value function (state -> item).
+# Every `every` items, the state is saved; item(n) then restarts from the
+# closest checkpoint before n, so at most `every` steps are ever repeated.
+class Checkpointed(LazySequence):
+    def __init__(self, initial, step, value=lambda state: state, every=1000):
+        self.step, self.value, self.every = step, value, every
+        self.indices, self.states = [0], [initial] # sorted checkpoints
+
+    def _state(self, n):
+        k = bisect_right(self.indices, n) - 1
+        i, state = self.indices[k], self.states[k]
+        while i < n:
+            state = self.step(state)
+            i += 1
+            if i % self.every == 0 and i > self.indices[-1]:
+                self.indices.append(i)
+                self.states.append(state)
+        return state
+
+    def item(self, n):
+        return self.value(self._state(n))
+
+    def iter_from(self, start):
+        state = self._state(start)
+        while True:
+            yield self.value(state)
+            state = self.step(state)
+
+
+# Example: a(0) = 1, a(n+1) = a(n) + sum of digits of a(n) (no closed form)
+digit_sums = Checkpointed(1, lambda a: a + sum(map(int, str(a))))
+
+# Same state machine as the Fib class in section 08, for comparison
+fib_steps = Checkpointed((0, 1), lambda s: (s[1], s[0] + s[1]),
+                         lambda s: s[1])
+
+
+
+if __name__ == '__main__':
+
+    fib = Fibonacci()
+    print(fib[:10])                 # 1 1 2 3 5 8 13 21 34 55
+    print(fib[10**5 : 10**5 + 3] == fib_steps[10**5 : 10**5 + 3])
+    print(fib[10**6].bit_length(), 'bits')
+    print(squares[10:20], integers[100:120:5])
+    print(list(islice(squares[10**12:], 3)))  # infinite slice: lazy
+    print(digit_sums[:10], digit_sums[10**5])
+
+    from timeit import timeit
+    def fib_gen():                  # the generator from section 08
+        prev, curr = 0, 1
+        while True:
+            yield curr
+            prev, curr = curr, prev + curr
+    n = 200000
+    print('islice(fib(), n, n+10):', timeit(lambda:
+          list(islice(fib_gen(), n, n + 10)), number=1))
+    print('Fibonacci()[n:n+10]:   ', timeit(lambda: fib[n : n + 10],
+                                            number=1))
+    digit_sums[n]                   # checkpoints are now saved, up to n
+    print('Checkpointed[n], again:', timeit(lambda: digit_sums[n - 7],
+                                            number=100) / 100)
+
+
+
+##
+##  END
+##
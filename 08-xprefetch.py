@@ -0,0 +1,221 @@
+###############################################################################
+##
+##  PYTHON PREFETCHING DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 08 (Iterators and Generators).
+## In a chain of generators, the consumer asks for an item, the producer
+## computes it, then waits until the consumer asks again: only one of them
+## works at any time. When the producer waits on I/O (e.g., reading files as
+## in section 06) and the consumer computes, both can work at the same time
+## if the producer runs ahead in a background thread (or process), putting
+## its items in a bounded queue: the consumer then takes them from there.
+## (cf. section 13 for more on threads and processes.)
+
+
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+from time import perf_counter, sleep
+
+
+class _Done:                        # end of stream marker (an instance of
+    pass                            # its own class: no item can be one)
+
+_DONE = _Done()
+
+class _Failure:                     # wraps an exception raised upstream
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class prefetch:
+    """Iterates over iterable in a background thread, keeping up to depth
+    items ready in a queue. Exceptions raised by the producer are raised
+    again in the consumer; closing the prefetch (or leaving a 'with' block)
+    stops the producer."""
+
+    def __init__(self, iterable, depth=8):
+        self.queue = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        self.produced = self.consumed = 0
+        self.depth_total = self.depth_max = 0   # queue depth metrics
+        self.consumer_wait = 0.0                # time spent waiting (s)
+        self.thread = threading.Thread(target=self._produce,
+                                       args=(iterable,), daemon=True)
+        self.thread.start()
+
+    def _put(self, item):           # gives up as soon as stopped is set
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, iterable):
+        it = None
+        try:
+            it = iter(iterable)     # (e.g. TypeError: goes to the consumer)
+            for item in it:
+                if not self._put(item): break
+                self.produced += 1
+            else:
+                self._put(_DONE)
+        except BaseException as exc:
+            self._put(_Failure(exc))
+        finally:
+            if hasattr(it, 'close'):    # e.g., generator: runs its finally
+                it.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.stopped.is_set():
+            raise StopIteration
+        depth = self.queue.qsize()
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+        start = perf_counter()
+        item = self.queue.get()
+        self.consumer_wait += perf_counter() - start
+        if isinstance(item, _Done):
+            self.stopped.set()
+            raise StopIteration
+        if isinstance(item, _Failure):
+            self.stopped.set()
+            raise item.exc
+        self.consumed += 1
+        return item
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def metrics(self):
+        return {'produced': self.produced, 'consumed': self.consumed,
+                'mean depth': self.depth_total / max(self.consumed, 1),
+                'max depth': self.depth_max,
+                'consumer wait': self.consumer_wait}
+
+
+# Threads only help when the producer waits (I/O, sleep...) since the GIL
+# lets one thread at a time run Python code. For a CPU-bound producer, use a
+# process instead: then the producer must be given as a (top-level, so it
+# can be pickled) generator function and its arguments, and the items must
+# be picklable too. Early close terminates the producer process. If the
+# producer process dies (killed, out of memory...), RuntimeError is raised.
+
+def _produce_in_process(q, func, args):
+    try:
+        for item in func(*args):
+            q.put(item)
+        q.put(_DONE)
+    except BaseException as exc:
+        try:
+            pickle.dumps(exc)
+        except Exception:           # (would be lost: send its text instead)
+            exc = RuntimeError('%s: %s' % (type(exc).__name__, exc))
+        q.put(_Failure(exc))
+
+def prefetch_process(func, *args, depth=8):
+    """Same as prefetch(func(*args), depth), running func in a process."""
+    q = multiprocessing.Queue(maxsize=depth)
+    p = multiprocessing.Process(target=_produce_in_process,
+                                args=(q, func, args), daemon=True)
+    p.start()
+    try:
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if p.is_alive(): continue
+                try:                # (anything sent just before it ended)
+                    item = q.get(timeout=0.1)
+                except queue.Empty:
+                    raise RuntimeError("producer process died (exit code "
+                                       "%s)" % p.exitcode) from None
+            if isinstance(item, _Done): break
+            if isinstance(item, _Failure): raise item.exc
+            yield item
+    finally:
+        if p.is_alive(): p.terminate()
+        p.join()
+
+
+# Examples: a slow producer (e.g., reading from disk or the network) and a
+# slow consumer (e.g., computing something with each line)
+
+def slow_lines(n, delay=0.01):
+    for i in range(n):
+        sleep(delay)                # I/O-like wait
+        yield 'line %d' % i
+
+def cpu_lines(n):
+    for i in range(n):
+        yield sum(range(20000)) + i # CPU-like work
+
+def failing_lines(n):
+    yield from slow_lines(n, 0)
+    raise IOError("disk on fire")
+
+def dying_lines(n):
+    yield from range(n)
+    os._exit(1)                     # e.g., killed by the system
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    def consume(lines, delay=0.01):
+        for line in lines:
+            sleep(delay)            # pretend to work on each line
+
+    t = perf_counter()
+    consume(slow_lines(100))
+    print('sequential: %.2fs' % (perf_counter() - t))   # about 2s
+
+    t = perf_counter()
+    with prefetch(slow_lines(100), depth=16) as lines:
+        consume(lines)
+    print('prefetched: %.2fs' % (perf_counter() - t))   # about 1s
+    print(lines.metrics())
+
+    try:                            # exceptions get through
+        for line in prefetch(failing_lines(3)): print(line)
+    except IOError as e:
+        print('caught:', e)
+
+    with prefetch(slow_lines(10**6)) as lines: # early close: producer stops
+        print(next(lines), next(lines))
+    print(lines.thread.is_alive())
+    try:
+        list(prefetch(42))          # not iterable: raised here, no hang
+    except TypeError as e:
+        print('caught:', e)
+
+    try:
+        for item in prefetch_process(dying_lines, 3): print(item)
+    except RuntimeError as e:
+        print('caught:', e)
+
+    t = perf_counter()
+    print(sum(prefetch_process(cpu_lines, 500, depth=32)),
+          'in %.2fs' % (perf_counter() - t))
+
+
+
+##
+##  END
+##
@@ -0,0 +1,145 @@
+###############################################################################
+##
+##  PYTHON REPLAYABLE TEE DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 08 (Iterators and Generators).
+## A generator can only be consumed once. To go over its items several times
+## one can call list() on it (everything in memory, at once), or use
+## itertools.tee(), which keeps in memory every item that one copy has seen
+## and another not yet (unbounded, if the copies drift apart). The Replay
+## class below keeps only the latest items in memory; older ones are written
+## (pickled) to a temporary file, and read back when a consumer needs them.
+## The position of each item in that file goes to a second file, an index of
+## fixed-size entries (item i's at 8*i), so memory use does not grow with the
+## number of items either.
+## Any number of consumers can be created, at any time, each reading at its
+## own position, from the start or from any index.
+
+
+import pickle
+import struct
+import tempfile
+from collections import deque
+
+
+_OFFSET = struct.Struct('<q')       # index entry: position in the data file
+
+
+class Replay:
+    """Records the items of iterable as they are requested by consumers,
+    keeping the last window items in memory and the others on disk."""
+
+    def __init__(self, iterable, window=1000):
+        self.source = iter(iterable)
+        self.window = window
+        self.memory = deque()       # items [self.first, self.count)
+        self.first = self.count = 0 # index of first item in memory, total
+        self.exhausted = False
+        self.file = tempfile.TemporaryFile()
+        self.index = tempfile.TemporaryFile()   # offsets of spilled items
+        self.end = 0                # end of file (where to write)
+        self.spilled = self.reloaded = 0
+
+    def _pull(self):                # gets one more item from the source
+        try:
+            item = next(self.source)
+        except StopIteration:
+            self.exhausted = True
+            return False
+        self.memory.append(item)
+        self.count += 1
+        if len(self.memory) > self.window:
+            self._spill(self.memory.popleft())
+        return True
+
+    def _spill(self, item):         # writes the oldest item to the file
+        self.index.seek(self.first * _OFFSET.size)
+        self.index.write(_OFFSET.pack(self.end))
+        self.file.seek(self.end)
+        pickle.dump(item, self.file, pickle.HIGHEST_PROTOCOL)
+        self.end = self.file.tell()
+        self.first += 1
+        self.spilled += 1
+
+    def get(self, index):
+        """Returns item index, reading from the source if needed; raises
+        IndexError past the end of the source."""
+        while index >= self.count:
+            if self.exhausted or not self._pull():
+                raise IndexError("replay index out of range")
+        if index >= self.first:
+            return self.memory[index - self.first]
+        self.index.seek(index * _OFFSET.size)
+        self.file.seek(_OFFSET.unpack(self.index.read(_OFFSET.size))[0])
+        self.reloaded += 1
+        return pickle.load(self.file)
+
+    def consumer(self, start=0):
+        """Returns a new iterator over the items, from index start."""
+        index = start
+        while True:
+            try:
+                item = self.get(index)
+            except IndexError:
+                return
+            yield item
+            index += 1
+
+    __iter__ = consumer
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+if __name__ == '__main__':
+
+    from itertools import islice, tee
+
+    def squares(n):                 # a generator, consumable only once
+        for i in range(n):
+            yield i * i
+
+    with Replay(squares(10), window=3) as r:
+        a, b = r.consumer(), r.consumer()
+        print(list(islice(a, 6)))   # a runs ahead: items 0..2 go to disk
+        print(list(b))              # b reads them back, then the rest
+        print(list(r.consumer(8)), r.spilled, r.reloaded)
+
+    # memory: tee() keeps all the items between two drifting consumers,
+    # whereas Replay keeps a fixed window (the rest goes to disk)
+    import tracemalloc
+    N = 200000
+    def records(n):
+        for i in range(n):
+            yield {'id': i, 'name': 'user%d' % i, 'score': i * 0.5}
+
+    tracemalloc.start()
+    first, second = tee(records(N))
+    for _ in first: pass            # first consumer drifts to the end
+    print('tee:    %d KB' % (tracemalloc.get_traced_memory()[0] // 1024))
+    print(sum(rec['score'] for rec in second))
+    del first, second
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    with Replay(records(N), window=1000) as r:
+        for _ in r.consumer(): pass
+        print('Replay: %d KB' % (tracemalloc.get_traced_memory()[0] // 1024))
+        print(sum(rec['score'] for rec in r.consumer()))
+    tracemalloc.stop()
+
+
+
+##
+##  END
+##
@@ -81,6 +81,7 @@ adr.replace('ROAD,', 'RD.,')        # OK, but what if . or ; instead of , ?
 re.sub('ROAD([.,;!])', 'RD.\\1', adr) # matches any punctuation!
 
 re.sub('\bROAD\b', 'RD.', adr)      # matches ROAD when it's a word by itsef
+                                    # (for many such rules: 09-xaddresses.py)
 
 re.sub('[.,;!?:]', '', 'Hello? cheers, uh? bye.') # strip any punctuation
 
@@ -224,6 +225,8 @@ htm1 = htm + '<h1>Section</h1><p>bla bla bla</p>'
 re.findall('<([^>]+)>.*</[^>]+>', htm1) # find open/close tags (wrong way) 
 re.findall('<([^>]+)>.*</\\1>', htm1) # matching tags using a back-reference
 re.findall(r'<([^>]+)>.*</\1>', htm1) # same, using raw string (no \ escape)
+# (some patterns backtrack exponentially on hostile input e.g., (a+)+$ : see
+# 09-xregexguard.py to detect them, and run them with a time limit)
 
 # Using back-references to replace a matched string
 re.sub('<title>(.*)</title>', 'Bibliography', htm) # wrong: replaces tags too
@@ -237,6 +240,8 @@ url = 'http://docs.python.org/3/tutorial/interpreter.html'
 url.split('://')[-1].split('/')[0].split('.')[-1]
 # now, using a regular expression
 re.findall('://.*\.(.*?)/', url)[0]
+# (both fail without a '/' after the host, or with a port: see 09-xurls.py
+# for a scanner that handles those, for whole columns of log URLs)
 
 # step by step:
 re.findall('://(.*)', url)          # find '://', keep right part only
@@ -261,6 +266,7 @@ re.findall('://(.*?/){3}', url)     # ex. to keep the third match only
 pat = re.compile('://.*\.(.*?)/')
 pat
 pat.findall(url)[0]                 # same as above, but faster!
+# (how much faster? see the benchmarks in 09-xregexbench.py)
 
 p = re.compile('f[a-z]*')
 p.findall('which foot or hand fell fastest')
@@ -276,6 +282,12 @@ for m in fit: print(m.group())      # for each match, print the string
 for m in p.finditer('which foot or hand fell fastest'): # new/reset iterator
     print(m.span())                 # for each match, print start/end pos
 
+# (to search files too large to be read as one string, see 09-xfilesearch.py)
+
+
+# note: re.search(pattern, ...) etc. also compile the pattern, but keep it in
+# a small cache; for programs using thousands of patterns, see the registry
+# in 09-xpatternregistry.py (bigger cache, preloading, usage statistics).
 
 # See also section 10. Reflection and Meta-programming, for compiling Python
 # functions, code fragments, etc.
@@ -296,6 +308,7 @@ p.split('which foot or hand fell fastest')
 p1 = re.compile(r'\W+')             # one or more non-alphanumeric character
 p1.split('which foot or hand fell fastest')
 p1.split('which foot, or hand; fell fastest? | with punctuation')
+# (to count the words of a large corpus using all cores: see 09-xwordcount.py)
 
 
 # Substitute the matched regular expression with another string
@@ -372,6 +385,7 @@ re.search(compiled_name_pattern, 'John M. Coetzee').groups()
 # - Searching: locating substrings that can have more than one form, for
 #   example, finding any of “pet.png”, “pet.jpg”, “pet.jpeg”, or “pet.svg”
 #   while avoiding “carpet.png” and similar
+#   (with thousands of alternatives, see the automaton in 09-xahocorasick.py)
 # - Replacing: for example, finding "bicycle" or "human powered vehicle"
 #   and replacing either with "bike"
 # - Splitting: breaking a string into multiple substrings everywhere a
@@ -401,6 +415,9 @@ roman_numeral_pattern = """
 re.search(roman_numeral_pattern, 'MCMLXXXIX', re.VERBOSE) # succeeds
 re.search(roman_numeral_pattern, 'MCMLXXXXIX', re.VERBOSE) # fails
 
+# (there are only 4999 valid numerals: see 09-xroman.py for converting and
+# validating them in bulk, using tables computed once, or an automaton)
+
 
 # This example shows how to parse US phone numbers
 phone_pattern = re.compile(r'''
@@ -418,6 +435,9 @@ phone_pattern = re.compile(r'''
 phone_pattern.search('800-555-1212')
 phone_pattern.search('work 1-(800) 555.1212 #1234').groups()
 
+# (to normalise millions of numbers, see 09-xphones.py: most of them need
+# no regex at all, just removing the non-digits and counting the digits)
+
 
 # Also: simulating 'scanf' and 'sscanf' in Python (because there aren't any).
 # Regular expressions can serve the same purpose, and are more powerful.
@@ -438,6 +458,10 @@ input_str = '1:3.0 false,hello'
 [t(s) for t,s in zip((int,float,bool,str),
  re.search('^(\d+):([\d.]+) (\w+),(\w+)$', input_str).groups())]
 
+# (09-xscanf.py turns scanf formats into such regexes and conversions, e.g.
+#  sscanf('/usr/sbin/sendmail - 0 errors, 4 warnings',
+#         '%s - %d errors, %d warnings') gives ('/usr/sbin/sendmail', 0, 4))
+
 
 
 ##
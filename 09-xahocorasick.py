@@ -0,0 +1,156 @@
+###############################################################################
+##
+##  PYTHON AHO-CORASICK DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## Finding any of many literal strings (e.g., "pet.png", "pet.jpg" ...) can
+## be done with one regex alternation 'pet\.png|pet\.jpg|...' but with
+## thousands of keywords, that regex is slow to compile, and slow to run as
+## it may try many alternatives at each position. The Aho-Corasick algorithm
+## builds, once, an automaton from all the keywords (a tree of prefixes plus
+## "failure" links), then finds all the occurrences of all the keywords in a
+## single pass over the text, whatever the number of keywords.
+
+
+import pickle
+from collections import deque
+
+
+class AhoCorasick:
+    """Automaton finding all occurrences of a set of keywords, either all
+    str (to scan str) or all bytes (to scan bytes)."""
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.goto = [{}]            # state -> {symbol: next state}
+        self.fail = [0]             # state -> longest proper suffix state
+        self.out = [[]]             # state -> keywords ending here (index)
+        for k, word in enumerate(self.keywords):
+            if not word: raise ValueError("empty keyword")
+            state = 0
+            for symbol in word:     # str: chars, bytes: ints
+                nxt = self.goto[state].get(symbol)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][symbol] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(k)
+        self._link()
+
+    def _link(self):                # breadth-first: failure links, outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and symbol not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(symbol, 0)
+                if self.fail[nxt] == nxt: self.fail[nxt] = 0 # depth 1
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def finditer(self, text, whole_words=False):
+        """Yields (start, end, keyword) for every occurrence of a keyword,
+        overlapping ones included, in order of end position. If whole_words
+        is true, only keeps matches between word boundaries (as with \\b)."""
+        goto, fail, out, keywords = self.goto, self.fail, self.out, \
+                                    self.keywords
+        state = 0
+        for i, symbol in enumerate(text):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            for k in out[state]:
+                word = keywords[k]
+                start, end = i + 1 - len(word), i + 1
+                if whole_words and not _at_boundaries(text, start, end):
+                    continue
+                yield start, end, word
+
+    def findall(self, text, whole_words=False):
+        return list(self.finditer(text, whole_words))
+
+    def save(self, filename):       # pickled: no need to rebuild at startup
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+
+_WORD_BYTES = frozenset(b'abcdefghijklmnopqrstuvwxyz'
+                        b'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+
+def _is_word(symbol):               # same as \w (ASCII only for bytes)
+    if isinstance(symbol, int):
+        return symbol in _WORD_BYTES
+    return symbol.isalnum() or symbol == '_'
+
+def _at_boundaries(text, start, end):  # as \b: no neighbour = non-word
+    before = start > 0 and _is_word(text[start-1])
+    after = end < len(text) and _is_word(text[end])
+    return (before != _is_word(text[start]) and
+            after != _is_word(text[end-1]))
+
+
+
+if __name__ == '__main__':
+
+    files = ['pet.png', 'pet.jpg', 'pet.jpeg', 'pet.svg']
+    ac = AhoCorasick(files)
+    text = 'see carpet.png, pet.jpeg and pet.svg'
+    print(ac.findall(text))         # includes the end of carpet.png
+    print(ac.findall(text, whole_words=True)) # as with \b...\b
+
+    print(AhoCorasick([b'he', b'she', b'his', b'hers']).findall(b'ushers'))
+
+    # Benchmark against one big regex, with 5000 keywords
+    import os
+    import random
+    import re
+    import tempfile
+    from time import perf_counter
+    random.seed(9)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = list({''.join(random.choices(letters, k=random.randint(4, 9)))
+                  for _ in range(5000)})
+    text = ' '.join(''.join(random.choices(letters, k=random.randint(3, 9)))
+                    for _ in range(20000))
+
+    t = perf_counter()
+    regex = re.compile('|'.join(map(re.escape,
+                       sorted(words, key=len, reverse=True))))
+    print('regex compile:      %.3fs' % (perf_counter() - t))
+    t = perf_counter()
+    n_re = sum(1 for _ in regex.finditer(text))
+    print('regex scan:         %.3fs' % (perf_counter() - t), n_re,
+          'non-overlapping matches')
+
+    t = perf_counter()
+    ac = AhoCorasick(words)
+    print('automaton build:    %.3fs' % (perf_counter() - t))
+    t = perf_counter()
+    n_ac = sum(1 for _ in ac.finditer(text))
+    print('automaton scan:     %.3fs' % (perf_counter() - t), n_ac,
+          'matches (all, overlapping)')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'keywords.ac')
+        ac.save(filename)
+        t = perf_counter()
+        ac = AhoCorasick.load(filename)
+        print('automaton unpickle: %.3fs' % (perf_counter() - t))
+
+
+
+##
+##  END
+##
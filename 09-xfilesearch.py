@@ -0,0 +1,142 @@
+###############################################################################
+##
+##  PYTHON FILE SEARCH DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## All the examples in that section search strings already in memory. To
+## search (grep) files of several GB, there are two ways to avoid reading
+## them whole: map the file in memory (mmap), which lets the regex engine
+## scan the bytes directly while the operating system loads pages as needed;
+## or read the file by large chunks, keeping the end of each chunk (overlap)
+## so that a match that spans two chunks is still found. Both report matches
+## with their offset in the file. Large jobs can be split over processes,
+## one file each, or one region of a big file each.
+
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _compile(pattern, flags=0):     # file contents are bytes, so patterns
+    if isinstance(pattern, str):    # given as str are encoded (UTF-8)
+        pattern = pattern.encode()
+    return re.compile(pattern, flags) if isinstance(pattern, bytes) \
+           else pattern
+
+def search_mmap(pattern, filename, start=0, end=None):
+    """Yields (offset, matched bytes) for each match in the file, or in the
+    region [start, end) of the file, using a memory map."""
+    pattern = _compile(pattern)
+    if os.path.getsize(filename) == 0: return   # (cannot map empty files)
+    with open(filename, 'rb') as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm) if end is None else end
+        for m in pattern.finditer(mm, start, end):
+            yield m.start(), m.group()
+
+CHUNK_SIZE = 1 << 24                # 16 MB
+OVERLAP = 1 << 12                   # longest match guaranteed to be found
+
+def search_chunks(pattern, filename, chunk_size=CHUNK_SIZE, overlap=OVERLAP):
+    """Yields (offset, matched bytes) for each match in the file, read by
+    chunks. Matches up to overlap bytes long are found even if they span
+    two chunks; each match is reported once."""
+    pattern = _compile(pattern)
+    base, carry, resume = 0, b'', 0 # offset of carry, kept bytes, where next
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = carry + chunk
+            cut = len(buf) if eof else max(len(buf) - overlap, 0)
+            for m in pattern.finditer(buf, resume):
+                if not eof and (m.start() >= cut or m.end() == len(buf)):
+                    cut = min(cut, m.start())   # may continue in next chunk:
+                    break                       # find it again from there
+                yield base + m.start(), m.group()
+                resume = m.end()
+            if eof: return
+            keep = max(cut - 1, 0)  # one more byte, as context for ^ \b etc.
+            base, carry = base + keep, buf[keep:]
+            resume = max(resume - keep, cut - keep)
+
+
+# Parallel versions: a pool of processes, each searching one file, or one
+# region of one file. Regions are cut at line ends, so that line-oriented
+# matches (as in logs) never straddle two regions.
+
+def _search_job(args):              # top-level, so that it can be pickled
+    pattern, filename, start, end = args
+    return filename, list(search_mmap(pattern, filename, start, end))
+
+def regions(filename, parts):
+    """Splits a file into parts (start, end) regions ending at line ends."""
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()            # move to the end of the current line
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+def search_files(pattern, filenames, workers=None, split=1):
+    """Searches several files in parallel, each file split into split
+    regions; returns {filename: [(offset, matched bytes), ...]}."""
+    pattern = _compile(pattern)
+    jobs = [(pattern, name, a, b) for name in filenames
+            for a, b in regions(name, split)]
+    results = {name: [] for name in filenames}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, matches in pool.map(_search_job, jobs):
+            results[name].extend(matches)
+    return results
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    import random
+    import tempfile
+    from time import perf_counter
+
+    random.seed(9)
+    with tempfile.TemporaryDirectory() as tmp:
+        filenames = []
+        for k in range(3):
+            filename = os.path.join(tmp, 'access%d.log' % k)
+            with open(filename, 'wb') as f:
+                for i in range(200000):
+                    level = random.choice([b'INFO', b'WARN', b'ERROR'])
+                    f.write(b'%d %s request from 10.0.%d.%d took %dms\n' %
+                            (i, level, random.randint(0, 255),
+                             random.randint(0, 255), random.randint(1, 999)))
+            filenames.append(filename)
+
+        errors = re.compile(rb'^\d+ ERROR .* (\d{3})ms$', re.MULTILINE)
+        t = perf_counter()
+        found = list(search_mmap(errors, filenames[0]))
+        print('mmap:    %d in %.2fs' % (len(found), perf_counter() - t))
+        print(found[:2])
+
+        t = perf_counter()          # tiny chunks, to exercise the overlaps
+        chunked = list(search_chunks(errors, filenames[0], 4096, 256))
+        print('chunks:  %d in %.2fs' % (len(chunked), perf_counter() - t))
+        print(chunked == found)
+
+        t = perf_counter()
+        results = search_files(errors, filenames, split=4)
+        print('parallel: %d in %.2fs' % (sum(map(len, results.values())),
+                                          perf_counter() - t))
+        print(results[filenames[0]] == found)
+
+
+
+##
+##  END
+##
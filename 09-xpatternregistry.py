@@ -0,0 +1,206 @@
+###############################################################################
+##
+##  PYTHON REGEX REGISTRY DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## Functions like re.search(pattern, string) compile the pattern each time,
+## unless it is found in a small internal cache of recently used patterns
+## (512 in recent versions). A program that uses thousands of different
+## patterns keeps evicting and recompiling them. The PatternRegistry below
+## is a cache with a size of our choosing, that can be filled at startup
+## from a list of patterns (manifest), and that counts, for each pattern,
+## how often it is used, how many matches it finds, and how long that takes
+## (finditer() is lazy: its matches are counted as they are used, but its
+## time is not). Statistics are kept for the most recently used patterns,
+## by default four times as many as the compiled ones.
+
+
+import json
+import re
+from collections import OrderedDict
+from time import perf_counter
+
+
+class PatternStats:
+    __slots__ = ('compiles', 'hits', 'calls', 'matches', 'time')
+    def __init__(self):
+        self.compiles = self.hits = self.calls = self.matches = 0
+        self.time = 0.0             # total time spent matching (s), except
+                                    # by finditer (lazy)
+    def __repr__(self):
+        return ('PatternStats(compiles=%d, hits=%d, calls=%d, matches=%d, '
+                'time=%.6f)' % (self.compiles, self.hits, self.calls,
+                                self.matches, self.time))
+
+
+# Number of matches found by each method, given its result
+_MATCHES = {
+    'search':    lambda result, p: result is not None,
+    'match':     lambda result, p: result is not None,
+    'fullmatch': lambda result, p: result is not None,
+    'findall':   lambda result, p: len(result),
+    'split':     lambda result, p: (len(result) - 1) // (p.groups + 1),
+    'subn':      lambda result, p: result[1],
+}
+
+
+class PatternRegistry:
+    """LRU cache of compiled patterns, with usage statistics, and the same
+    functions as the re module (search, match, findall, sub, etc.)"""
+
+    def __init__(self, maxsize=4096, stats_maxsize=None):
+        self.maxsize = maxsize
+        self.stats_maxsize = stats_maxsize or 4 * maxsize
+        self.patterns = OrderedDict()   # (pattern, flags) -> compiled
+        self.stats = OrderedDict()      # (pattern, flags) -> PatternStats
+
+    def _stats(self, key):              # (LRU too, so memory stays bounded)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = PatternStats()
+            if len(self.stats) > self.stats_maxsize:
+                self.stats.popitem(last=False)
+        else:
+            self.stats.move_to_end(key)
+        return stats
+
+    def compile(self, pattern, flags=0):
+        if isinstance(pattern, re.Pattern): # already compiled: use as is
+            return pattern
+        key = (pattern, flags)
+        stats = self._stats(key)
+        compiled = self.patterns.get(key)
+        if compiled is not None:
+            self.patterns.move_to_end(key)  # most recently used
+            stats.hits += 1
+            return compiled
+        compiled = self.patterns[key] = re.compile(pattern, flags)
+        stats.compiles += 1
+        if len(self.patterns) > self.maxsize:
+            self.patterns.popitem(last=False)   # least recently used
+        return compiled
+
+    def load_manifest(self, manifest):
+        """Precompiles patterns from a list of patterns or of [pattern,
+        flags] pairs, or from a JSON file holding such a list; flags may be
+        an int or flag names such as "IGNORECASE|VERBOSE"."""
+        if isinstance(manifest, str):
+            with open(manifest) as f:
+                manifest = json.load(f)
+        for entry in manifest:
+            pattern, flags = (entry, 0) if isinstance(entry, str) else entry
+            if isinstance(flags, str):
+                flags = sum(getattr(re, name.strip()) for name in
+                            flags.split('|') if name.strip())
+            self.compile(pattern, flags)
+
+    def _compile_with_stats(self, pattern, flags):
+        compiled = self.compile(pattern, flags)
+        if isinstance(pattern, re.Pattern):
+            key = (pattern.pattern, pattern.flags)
+        else:
+            key = (pattern, flags)
+        stats = self._stats(key)
+        stats.calls += 1
+        return compiled, stats
+
+    def _call(self, method, pattern, flags, *args):
+        compiled, stats = self._compile_with_stats(pattern, flags)
+        start = perf_counter()
+        result = getattr(compiled, method)(*args)
+        stats.time += perf_counter() - start
+        stats.matches += _MATCHES[method](result, compiled)
+        return result
+
+    def _counted(self, stats, matches):
+        for m in matches:
+            stats.matches += 1
+            yield m
+
+    def search(self, pattern, string, flags=0):
+        return self._call('search', pattern, flags, string)
+
+    def match(self, pattern, string, flags=0):
+        return self._call('match', pattern, flags, string)
+
+    def fullmatch(self, pattern, string, flags=0):
+        return self._call('fullmatch', pattern, flags, string)
+
+    def findall(self, pattern, string, flags=0):
+        return self._call('findall', pattern, flags, string)
+
+    def finditer(self, pattern, string, flags=0):
+        compiled, stats = self._compile_with_stats(pattern, flags)
+        return self._counted(stats, compiled.finditer(string))
+
+    def split(self, pattern, string, maxsplit=0, flags=0):
+        return self._call('split', pattern, flags, string, maxsplit)
+
+    def sub(self, pattern, repl, string, count=0, flags=0):
+        return self._call('subn', pattern, flags, repl, string, count)[0]
+
+    def subn(self, pattern, repl, string, count=0, flags=0):
+        return self._call('subn', pattern, flags, repl, string, count)
+
+    def top(self, n=10, key='calls'):
+        """Returns the n patterns with the highest given statistic."""
+        return sorted(self.stats.items(), reverse=True,
+                      key=lambda item: getattr(item[1], key))[:n]
+
+    def hit_rate(self):
+        hits = sum(s.hits for s in self.stats.values())
+        total = hits + sum(s.compiles for s in self.stats.values())
+        return hits / total if total else 0.0
+
+    def clear(self):
+        self.patterns.clear()
+        self.stats.clear()
+
+
+# A default registry, and module-level functions with the same names and
+# arguments as the re module's, so that they can be used in its place
+registry = PatternRegistry()
+compile, search, match, fullmatch = (registry.compile, registry.search,
+                                     registry.match, registry.fullmatch)
+findall, finditer, split = (registry.findall, registry.finditer,
+                            registry.split)
+sub, subn = registry.sub, registry.subn
+
+
+
+if __name__ == '__main__':
+
+    url = 'http://docs.python.org/3/tutorial/interpreter.html'
+    print(findall(r'://.*\.(.*?)/', url)[0])
+    print(sub(r'\bROAD\b', 'RD.', '100 NORTH BROAD ROAD, LONDON NW1, UK'))
+    print(search(r'(\w+)\s+(?:([\w.]+)\s+)?(\w+)', 'John M. Coetzee').groups())
+    print(findall('[aeiou]', 'WHICH FOOT', flags=re.IGNORECASE))
+    registry.load_manifest([r'\d+', ['(cat|dog)s', 'IGNORECASE']])
+    for (pattern, flags), stats in registry.top(3, key='compiles'):
+        print(repr(pattern), flags, stats)
+    search('zzz', 'abc'); findall('zzz', 'abc'); split('zzz', 'abc')
+    sub('zzz', '', 'abc'); list(finditer('zzz', 'abc'))    # no matches
+    print(len(list(finditer(r'\d', 'a1b2c3'))), split(r'(-)', '1-2-3'))
+    print(registry.stats['zzz', 0], registry.stats[r'\d', 0])
+
+    # Under load: 3000 patterns used in turns, more than re's own cache
+    from timeit import timeit
+    words = ['word%d' % i for i in range(3000)]
+    text = ' '.join(words[::300])
+    def with_re():
+        for w in words: re.search(r'\b' + w + r'\b', text)
+    big = PatternRegistry(maxsize=4000)
+    big.load_manifest([r'\b' + w + r'\b' for w in words])
+    def with_registry():
+        for w in words: big.search(r'\b' + w + r'\b', text)
+    print('re module cache:', timeit(with_re, number=3))
+    print('registry:       ', timeit(with_registry, number=3))
+    print('hit rate: %.3f' % big.hit_rate())
+
+
+
+##
+##  END
+##
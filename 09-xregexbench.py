@@ -0,0 +1,226 @@
+###############################################################################
+##
+##  PYTHON REGEX BENCHMARK DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## That section says compiled patterns are faster, and that finditer() is
+## better than findall(); this measures it. The patterns of the section (URL,
+## phone number, roman numeral, name, greedy vs. non-greedy tags, words) are
+## run over generated texts of 1000, 10000 and 100000 lines, in five ways:
+##   re.func   re.findall(pattern, line) for each line (with cache lookup)
+##   compiled  p.findall(line) for each line
+##   findall   p.findall(text) on the whole text, in one call
+##   finditer  [m.group() for m in p.finditer(text)], on the whole text
+##   bytes     the same pattern as bytes, findall() on the encoded text
+## All five must find the same matches (this is checked before timing): in
+## the whole text, \D* and \s+ would go on to the next line, so the patterns
+## with those are given in a version that stays within a line, e.g. [^\d\n]*.
+## Results are saved in a JSON file (the 'baseline', in the home directory
+## by default), with the Python version and platform; the next run compares
+## its results with it and shows what got over 50% slower, e.g. after
+## upgrading Python (smaller differences are mostly noise). Each timing is
+## the best of 5, each of which repeats the work enough times to last at
+## least 20 ms.
+## Usage:  python 09-xregexbench.py [--save] [baseline.json]
+
+
+import json
+import os
+import platform
+import random
+import re
+import sys
+from timeit import Timer
+
+
+# name: (pattern, flags, function returning a random line), from section 09
+
+def _url_line():
+    return 'GET http://%s.%s/%s/page%d.html 200' % (
+        random.choice(['docs.python', 'www.python', 'pypi', 'github']),
+        random.choice(['org', 'com', 'co.uk']),
+        random.choice(['a', 'b', 'doc']), random.randint(1, 999))
+
+def _phone_line():
+    return random.choice(['{}-{}-{}', '({}) {} {}', '{}{}{}', '{}.{}.{} x42',
+                          'work 1-({}) {}.{} #1234']).format(
+        random.randint(200, 999), random.randint(100, 999),
+        random.randint(1000, 9999))
+
+def _roman_line():
+    return ''.join(random.choices('MDCLXVI', k=random.randint(1, 10)))
+
+def _name_line():
+    return '%s %s%s' % (random.choice(['John', 'Mary', 'Ada', 'Alan']),
+                        random.choice(['M. ', '', 'Maxwell ', '']),
+                        random.choice(['Coetzee', 'Lovelace', 'Turing']))
+
+def _html_line():
+    return '<p><b>%s</b> bla <i>bla</i></p>' % random.choice(
+        ['Tutorial', 'Section', 'Chapter 9', 'Notes'])
+
+def _text_line():
+    return ' '.join(random.choices(['which', 'foot', 'or', 'hand', 'fell',
+                                    'fastest', 'fool', 'the'], k=10))
+
+roman_numeral_pattern = r'''
+    ^M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})$'''
+phone_pattern = r'''
+    (\d{3})\D*(\d{3})\D*(\d{4})\D*(\d*)$'''
+name_pattern = r'''
+    (\w+)\s+(?:([\w.]+)\s+)?(\w+)'''
+
+# Versions for the whole text, where \D and \s must not match a newline
+TEXT_PATTERNS = {
+    'phone': phone_pattern.replace(r'\D*', r'[^\d\n]*'),
+    'name':  name_pattern.replace(r'\s+', r'[^\S\n]+'),
+}
+
+PATTERNS = {
+    'url':        (r'://.*\.(.*?)/', 0, _url_line),
+    'phone':      (phone_pattern, re.VERBOSE, _phone_line),
+    'roman':      (roman_numeral_pattern, re.VERBOSE, _roman_line),
+    'name':       (name_pattern, re.VERBOSE, _name_line),
+    'greedy':     (r'<.*>', 0, _html_line),
+    'non-greedy': (r'<.*?>', 0, _html_line),
+    'tags':       (r'<([^>]+)>', 0, _html_line),
+    'f-words':    (r'f[a-z]*', 0, _text_line),
+}
+SIZES = (1000, 10000, 100000)
+
+
+def variants(pattern, flags, lines, text_pattern=None):
+    """Returns {variant: function} for the pattern and the lines; each
+    function returns the list of matches, as findall() gives them."""
+    text = '\n'.join(lines)         # ^ and $ match at each line in MULTILINE
+    data = text.encode()
+    text_pattern = text_pattern or pattern
+    compiled = re.compile(pattern, flags)
+    whole = re.compile(text_pattern, flags | re.MULTILINE)
+    as_bytes = re.compile(text_pattern.encode(), flags | re.MULTILINE)
+    def re_func():
+        return [found for line in lines
+                for found in re.findall(pattern, line, flags)]
+    def compiled_findall():
+        return [found for line in lines for found in compiled.findall(line)]
+    def findall():
+        return whole.findall(text)
+    def finditer():                 # (using each match, as findall does)
+        if whole.groups == 0:
+            return [m.group() for m in whole.finditer(text)]
+        if whole.groups == 1:
+            return [m.group(1) or '' for m in whole.finditer(text)]
+        return [m.groups('') for m in whole.finditer(text)]
+    def bytes_findall():
+        return as_bytes.findall(data)
+    return {'re.func': re_func, 'compiled': compiled_findall,
+            'findall': findall, 'finditer': finditer,
+            'bytes': bytes_findall}
+
+def _decoded(found):                # bytes matches -> str, for comparing
+    if isinstance(found, bytes): return found.decode()
+    return tuple(map(_decoded, found))
+
+def check(funcs):
+    """Raises AssertionError unless all the variants find the same."""
+    expected = None
+    for variant, func in funcs.items():
+        found = func()
+        if variant == 'bytes':
+            found = [_decoded(f) for f in found]
+        if expected is None:
+            expected = found
+        assert found == expected, "%s: %d matches instead of %d" % (
+            variant, len(found), len(expected))
+
+def best_time(func, repeats=5, min_time=0.02):
+    """Returns the best time of one call to func."""
+    timer = Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10
+    return min(timer.repeat(repeats, number)) / number
+
+def run(patterns=PATTERNS, sizes=SIZES, seed=9):
+    """Returns {pattern name: {size: {variant: best time in seconds}}}."""
+    results = {}
+    for name, (pattern, flags, line) in patterns.items():
+        random.seed(seed)
+        lines = [line() for _ in range(max(sizes))]
+        results[name] = {}
+        for size in sizes:
+            funcs = variants(pattern, flags, lines[:size],
+                             TEXT_PATTERNS.get(name))
+            check(funcs)
+            results[name][str(size)] = {     # (JSON keys are strings)
+                variant: best_time(func) for variant, func in funcs.items()}
+    return results
+
+def environment():
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'machine': platform.machine()}
+
+def save(results, filename):
+    with open(filename, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f,
+                  indent=1, sort_keys=True)
+
+def compare(results, baseline, threshold=1.5):
+    """Prints the timings that are over threshold times the baseline's;
+    returns their number."""
+    old = baseline['results']
+    slower = 0
+    for name, sizes in results.items():
+        for size, times in sizes.items():
+            for variant, t in times.items():
+                try:
+                    before = old[name][size][variant]
+                except KeyError:    # new pattern, size or variant
+                    continue
+                if t > before * threshold:
+                    slower += 1
+                    print('SLOWER %-10s %7s %-8s %.4fs -> %.4fs (x%.2f)' %
+                          (name, size, variant, before, t, t / before))
+    return slower
+
+def report(results):
+    names = list(next(iter(next(iter(results.values())).values())))
+    print('%-10s %7s' % ('pattern', 'lines') +
+          ''.join('%10s' % n for n in names))
+    for name, sizes in results.items():
+        for size, times in sizes.items():
+            print('%-10s %7s' % (name, size) +
+                  ''.join('%10.4f' % times[n] for n in names))
+
+def main(args):
+    store = '--save' in args
+    args = [a for a in args if a != '--save']
+    filename = args[0] if args else os.path.join(
+        os.path.expanduser('~'), '.09-xregexbench.json')
+    results = run()
+    report(results)
+    if os.path.exists(filename):
+        with open(filename) as f:
+            baseline = json.load(f)
+        print('\nvs. baseline (Python %s on %s):' % (
+            baseline['environment']['python'],
+            baseline['environment']['platform']))
+        print(compare(results, baseline), 'slower timings')
+    if store or not os.path.exists(filename):
+        save(results, filename)
+        print('baseline saved in', filename)
+
+
+
+if __name__ == '__main__':
+
+    main(sys.argv[1:])
+
+
+
+##
+##  END
+##
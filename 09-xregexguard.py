@@ -0,0 +1,320 @@
+###############################################################################
+##
+##  PYTHON REGEX GUARD DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## That section shows how a greedy .* backtracks, and uses back-references
+## e.g., <([^>]+)>(.*)</\1>. Some pattern shapes backtrack exponentially on
+## inputs that almost match: (a+)+$ on 'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaa!'
+## tries every way of splitting the a's before failing, and one such match
+## can keep a CPU busy for hours. Two defences are shown here:
+## - risks() inspects the parsed pattern (the tree the re module builds
+##   before compiling) for the risky shapes: nested quantifiers (a+)+ or
+##   (.*a){12} (a bounded repeat of 12 is enough to take seconds),
+##   overlapping alternatives repeated (a|ab)*, adjacent quantifiers that
+##   can match the same characters .*.*, and back-references;
+## - RegexGuard runs the risky patterns in a worker process, waits for at
+##   most `timeout` seconds, and kills (then restarts) the worker if needed.
+##   The re module has no step counter, so time is the budget; and a thread
+##   cannot be stopped, hence a process. Inputs that timed out are kept in a
+##   quarantine list, and rejected at once if seen again. A worker that
+##   dies (killed, out of memory) raises WorkerError, and is replaced.
+## (On Unix, in the main thread only, signal.alarm() can also interrupt a
+## match since re checks for signals, but that does not work everywhere.)
+
+
+import re
+from collections import Counter, deque, namedtuple
+from multiprocessing import Pipe, Process
+from time import perf_counter
+
+try:
+    from re import _parser as sre_parse # Python 3.11+
+except ImportError:
+    import sre_parse
+
+
+# Static analysis of the parsed pattern: a list of (opcode, argument) items,
+# where argument may itself contain lists of items (groups, repeats...)
+
+P = sre_parse
+_REPEATS = (P.MAX_REPEAT, P.MIN_REPEAT)
+_POSSESSIVE = (getattr(P, 'POSSESSIVE_REPEAT', None),  # can't backtrack
+               getattr(P, 'ATOMIC_GROUP', None))       # (Python 3.11+)
+_WORD = set(range(ord('0'), ord('9') + 1)) | set(range(ord('A'), ord('Z') +
+        1)) | set(range(ord('a'), ord('z') + 1)) | {ord('_')}
+_CATEGORIES = {P.CATEGORY_DIGIT: set(range(ord('0'), ord('9') + 1)),
+               P.CATEGORY_WORD: _WORD,             # (ASCII approximation)
+               P.CATEGORY_SPACE: set(map(ord, ' \t\n\r\f\v'))}
+
+def _charset(items):                # chars of a [...] set, None if too many
+    chars = set()
+    for op, av in items:
+        if op == P.LITERAL:
+            chars.add(av)
+        elif op == P.RANGE and av[1] - av[0] < 256:
+            chars.update(range(av[0], av[1] + 1))
+        elif op == P.CATEGORY and av in _CATEGORIES:
+            chars |= _CATEGORIES[av]
+        else:                       # negated sets, \W, \S, wide ranges...
+            return None
+    return chars
+
+def _first(items):
+    """Returns the set of chars a sequence can start with, None for 'any'
+    (an over-approximation, so that overlaps are never missed)."""
+    for op, av in items:
+        if op == P.LITERAL:
+            return {av}
+        elif op == P.IN:
+            return _charset(av)
+        elif op == P.SUBPATTERN:
+            return _first(av[-1])
+        elif op in _REPEATS or op in _POSSESSIVE and op is not None:
+            if op == _POSSESSIVE[1]:
+                return _first(av)
+            return _first(av[2]) if av[0] > 0 else None
+        elif op == P.BRANCH:
+            chars = set()
+            for alternative in av[1]:
+                first = _first(alternative)
+                if first is None: return None
+                chars |= first
+            return chars
+        elif op in (P.AT, P.ASSERT, P.ASSERT_NOT):
+            continue                # zero-width, look at the next item
+        else:                       # ANY, NOT_LITERAL, GROUPREF...
+            return None
+    return set()                    # (empty: can match the empty string)
+
+def _overlap(a, b):
+    return a is None or b is None or not a or not b or bool(a & b)
+
+def _walk(items, repeated, found):
+    after = False                   # just after an unbounded x* or x+?
+    for op, av in items:
+        unbounded = False
+        if op in _REPEATS:
+            low, high, item = av
+            unbounded = high == P.MAXREPEAT
+            if repeated and high > 1:
+                found.add('nested quantifiers')
+            if unbounded and after and _overlap(previous, _first(item)):
+                found.add('adjacent overlapping quantifiers')
+            previous = _first(item)
+            _walk(item, repeated or high > 1, found)    # e.g. (.*a){12}
+        elif op in _POSSESSIVE and op is not None:
+            _walk(av if op == _POSSESSIVE[1] else av[2], False, found)
+        elif op == P.SUBPATTERN:
+            _walk(av[-1], repeated, found)
+        elif op == P.BRANCH:
+            alternatives = av[1]
+            if repeated and any(_overlap(_first(a), _first(b))
+                                for i, a in enumerate(alternatives)
+                                for b in alternatives[i+1:]):
+                found.add('overlapping alternation')
+            for alternative in alternatives:
+                _walk(alternative, repeated, found)
+        elif op == P.GROUPREF:
+            found.add('backreference')
+        elif op == P.GROUPREF_EXISTS:
+            found.add('backreference')
+            _walk(av[1], repeated, found)
+            if av[2]: _walk(av[2], repeated, found)
+        elif op in (P.ASSERT, P.ASSERT_NOT):
+            _walk(av[1], repeated, found)
+        after = unbounded
+
+def risks(pattern, flags=0):
+    """Returns the sorted list of risky shapes found in pattern (empty if
+    none). This is a heuristic: safe patterns may be flagged, e.g. (ab+)*"""
+    found = set()
+    _walk(sre_parse.parse(pattern, flags), False, found)
+    return sorted(found)
+
+
+# Guarded execution: patterns without risks run here, as usual; the others
+# are sent to a worker process through a pipe. re.Match objects can't be
+# sent back (they can't be pickled), so matches are returned as Found tuples.
+
+Found = namedtuple('Found', 'span group groups')
+
+class RegexTimeout(RuntimeError):
+    pass
+
+class WorkerError(RuntimeError):    # the worker process died (e.g. killed)
+    pass
+
+def _call(regex, method, args):
+    result = getattr(regex, method)(*args)
+    if isinstance(result, re.Match):
+        return Found(result.span(), result.group(), result.groups())
+    return result
+
+def _worker(conn):                  # top-level, so that it can be pickled
+    compiled = {}
+    while True:
+        try:
+            method, pattern, flags, args = conn.recv()
+        except EOFError:            # the guard was closed
+            return
+        try:
+            regex = compiled.get((pattern, flags))
+            if regex is None:
+                regex = compiled[pattern, flags] = re.compile(pattern, flags)
+            conn.send((True, _call(regex, method, args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class RegexGuard:
+    """Runs regex methods with a time budget for risky patterns."""
+
+    def __init__(self, timeout=1.0, strict=False, always=False,
+                 quarantine=1000):
+        self.timeout = timeout
+        self.strict = strict        # refuse risky patterns altogether
+        self.always = always        # use the worker even for safe patterns
+        self.risks = {}             # (pattern, flags) -> list of risks
+        self.quarantine = deque(maxlen=quarantine) # (pattern, input, time)
+        self._quarantined = set()   # keys of the inputs in quarantine
+        self.stats = Counter()
+        self._process = self._conn = None
+
+    def compile(self, pattern, flags=0):
+        """Checks pattern (once); returns its list of risks."""
+        key = pattern, flags
+        found = self.risks.get(key)
+        if found is None:
+            re.compile(pattern, flags)  # syntax errors are raised here
+            found = self.risks[key] = risks(pattern, flags)
+            if found and self.strict:
+                raise ValueError("risky pattern %r: %s" %
+                                 (pattern, ', '.join(found)))
+        return found
+
+    def _start(self):
+        self._conn, child = Pipe()
+        self._process = Process(target=_worker, args=(child,), daemon=True)
+        self._process.start()
+        child.close()
+
+    def close(self):
+        if self._process is not None:
+            self._conn.close()
+            self._process.terminate()
+            self._process.join()
+            self._process = self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self, method, pattern, flags, string, *args):
+        key = pattern, flags, len(string), hash(string)
+        if key in self._quarantined:
+            self.stats['rejected'] += 1
+            raise RegexTimeout("input in quarantine for %r" % pattern)
+        if method == 'sub':         # sub(repl, string, count)
+            args = args[:1] + (string,) + args[1:]
+        else:
+            args = (string,) + args
+        if not self.compile(pattern, flags) and not self.always:
+            self.stats['direct'] += 1
+            return _call(re.compile(pattern, flags), method, args)
+        if self._process is None:
+            self._start()
+        self.stats['guarded'] += 1
+        start = perf_counter()
+        try:
+            self._conn.send((method, pattern, flags, args))
+            answered = self._conn.poll(self.timeout)
+            if answered:
+                ok, result = self._conn.recv()
+        except (EOFError, OSError) as e:    # (a dead worker closes its end)
+            self.close()            # a new one will start
+            self.stats['deaths'] += 1
+            raise WorkerError("worker process died running %r" % pattern) \
+                from e
+        if answered:
+            if not ok: raise result
+            return result
+        self.close()                # kill the worker, a new one will start
+        self.stats['timeouts'] += 1
+        if len(self.quarantine) == self.quarantine.maxlen:
+            (old, old_flags), old_string, _ = self.quarantine[0]
+            self._quarantined.discard((old, old_flags, len(old_string),
+                                       hash(old_string)))
+        self.quarantine.append(((pattern, flags), string,
+                                perf_counter() - start))
+        self._quarantined.add(key)
+        raise RegexTimeout("%r took more than %gs on %r" %
+                           (pattern, self.timeout, string[:40]))
+
+    def search(self, pattern, string, flags=0):
+        return self._run('search', pattern, flags, string)
+
+    def match(self, pattern, string, flags=0):
+        return self._run('match', pattern, flags, string)
+
+    def fullmatch(self, pattern, string, flags=0):
+        return self._run('fullmatch', pattern, flags, string)
+
+    def findall(self, pattern, string, flags=0):
+        return self._run('findall', pattern, flags, string)
+
+    def split(self, pattern, string, maxsplit=0, flags=0):
+        return self._run('split', pattern, flags, string, maxsplit)
+
+    def sub(self, pattern, repl, string, count=0, flags=0):
+        """repl must be a string (a function would have to be pickled)."""
+        return self._run('sub', pattern, flags, string, repl, count)
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    # Patterns from section 09, and a few classic risky ones
+    patterns = [r'<([^>]+)>', r'<([^>]+)>(.*)</\1>', r'://.*\.(.*?)/',
+                r'(\d{3})\D*(\d{3})\D*(\d{4})\D*(\d*)$',
+                r'^M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})$',
+                r'(a+)+$', r'^(\w+\s?)*$', r'(a|ab)*c', r'(x|y|z)*!',
+                r'.*.*=.*', r'\d+\.\d+', r'(?:a++)+$', r'(.*a){12}$',
+                r'(?:a+){1,50}b']
+    for pattern in patterns:
+        print('%-58s %s' % (pattern, ', '.join(risks(pattern)) or 'ok'))
+
+    hostile = 'a' * 40 + '!'
+    sentence = 'an input that almost matches the pattern ' * 2 + '!'
+    with RegexGuard(timeout=0.5) as guard:
+        print(guard.search(r'<([^>]+)>', '<b>bold</b>'))
+        print(guard.sub(r'(\w+)@(\w+)', r'\2 at \1', 'me@home, you@work'))
+        for pattern, string in [(r'(a+)+$', hostile), (r'(a+)+$', 'aaa'),
+                                (r'^(\w+\s?)*$', sentence),
+                                (r'(a+)+$', hostile)]:
+            start = perf_counter()
+            try:
+                result = guard.search(pattern, string)
+            except RegexTimeout as e:
+                result = 'RegexTimeout: %s' % e
+            print('%.2fs' % (perf_counter() - start), result)
+        print([(p, s[:12], round(t, 2)) for p, s, t in guard.quarantine])
+        guard.search(r'(a+)+$', 'aaa')
+        guard._process.kill()       # a worker that dies is replaced too
+        guard._process.join()
+        try:
+            guard.search(r'(a+)+$', 'aaa')
+        except WorkerError as e:
+            print('WorkerError:', e)
+        print(guard.search(r'(a+)+$', 'aaa'))
+        print(dict(guard.stats))
+
+
+
+##
+##  END
+##
@@ -0,0 +1,171 @@
+###############################################################################
+##
+##  PYTHON ROMAN NUMERALS DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## roman_numeral_pattern in that section validates one roman numeral at a
+## time, and does not give its value. Since there are only 4999 valid ones
+## (M{0,4} allows up to MMMMCMXCIX), all of them can be computed once, in
+## both directions: a list from value to numeral, a dict from numeral to
+## value. Converting or validating is then a single lookup. For validating
+## without the dict, the same set is also compiled into a small automaton
+## (DFA) that reads one letter at a time, much like the regex engine does.
+
+
+import re
+
+try:
+    import numpy as np
+except ImportError:                 # arrays are optional
+    np = None
+
+
+MAX_ROMAN = 4999
+
+def _to_roman(n):                   # used once, to build the tables
+    digits = [('M', 1000), ('CM', 900), ('D', 500), ('CD', 400),
+              ('C', 100), ('XC', 90), ('L', 50), ('XL', 40),
+              ('X', 10), ('IX', 9), ('V', 5), ('IV', 4), ('I', 1)]
+    result = []
+    for numeral, value in digits:
+        count, n = divmod(n, value)
+        result.append(numeral * count)
+    return ''.join(result)
+
+TO_ROMAN = [''] + [_to_roman(n) for n in range(1, MAX_ROMAN + 1)]
+FROM_ROMAN = {numeral: n for n, numeral in enumerate(TO_ROMAN) if n}
+
+def to_roman(n):
+    if not 0 < n <= MAX_ROMAN:
+        raise ValueError("roman numerals go from 1 to %d" % MAX_ROMAN)
+    return TO_ROMAN[n]
+
+def from_roman(s):
+    try:
+        return FROM_ROMAN[s]
+    except KeyError:
+        raise ValueError("invalid roman numeral: %r" % s) from None
+
+
+# DFA: start with a tree of all numerals (a state per prefix), then merge the
+# states that accept the same suffixes, from the leaves up (minimisation).
+# States are numbered, and transitions stored as one dict per state.
+
+def _build_dfa(words):
+    trie = [{}]                     # state -> {letter: state}
+    final = [False]
+    for word in words:
+        state = 0
+        for letter in word:
+            if letter not in trie[state]:
+                trie[state][letter] = len(trie)
+                trie.append({})
+                final.append(False)
+            state = trie[state][letter]
+        final[state] = True
+    canonical, signature_ids, order = {}, {}, []
+    stack = [(0, False)]            # post-order: children before parents
+    while stack:
+        state, done = stack.pop()
+        if done:
+            order.append(state)
+        else:
+            stack.append((state, True))
+            stack.extend((child, False) for child in trie[state].values())
+    for state in order:
+        signature = (final[state], tuple(sorted(
+            (letter, canonical[child]) for letter, child in
+            trie[state].items())))
+        canonical[state] = signature_ids.setdefault(signature,
+                                                    len(signature_ids))
+    table = [None] * len(signature_ids)
+    accepting = [False] * len(signature_ids)
+    for (is_final, edges), sid in signature_ids.items():
+        table[sid] = dict(edges)
+        accepting[sid] = is_final
+    return table, accepting, canonical[0]
+
+DFA, ACCEPTING, START = _build_dfa(TO_ROMAN[1:])
+
+def is_roman(s):
+    """Validates a roman numeral with the DFA (no regex, no dict of all)."""
+    state = START
+    for letter in s:
+        state = DFA[state].get(letter)
+        if state is None: return False
+    return ACCEPTING[state]
+
+
+# Batch versions, on lists (or numpy arrays): invalid items give 0 or ''
+def to_roman_batch(values):
+    if np is not None and isinstance(values, np.ndarray):
+        table = np.array(TO_ROMAN, dtype=object)
+        return table[np.where((values > 0) & (values <= MAX_ROMAN),
+                              values, 0)]
+    return [TO_ROMAN[n] if 0 < n <= MAX_ROMAN else '' for n in values]
+
+def from_roman_batch(numerals):
+    result = list(map(FROM_ROMAN.get, numerals, [0] * len(numerals)))
+    if np is not None and isinstance(numerals, np.ndarray):
+        return np.array(result, dtype=np.int32)
+    return result
+
+def validate_batch(numerals):
+    return [s in FROM_ROMAN for s in numerals]
+
+
+roman_numeral_pattern = """
+    ^                   # beginning of string
+    M{0,4}              # thousands - 0 to 4 M's
+    (CM|CD|D?C{0,3})    # hundreds - 900 (CM), 400 (CD), 0-300 (0 to 3 C's),
+                        #            or 500-800 (D, followed by 0 to 3 C's)
+    (XC|XL|L?X{0,3})    # tens - 90 (XC), 40 (XL), 0-30 (0 to 3 X's),
+                        #        or 50-80 (L, followed by 0 to 3 X's)
+    (IX|IV|V?I{0,3})    # ones - 9 (IX), 4 (IV), 0-3 (0 to 3 I's),
+                        #        or 5-8 (V, followed by 0 to 3 I's)
+    $                   # end of string
+    """
+
+
+
+if __name__ == '__main__':
+
+    print(to_roman(1989), from_roman('MCMLXXXIX'), is_roman('MCMLXXXXIX'))
+    print(len(DFA), 'DFA states')   # for all 4999 numerals
+
+    # same answers as the regex (except for '', which the regex accepts)
+    pattern = re.compile(roman_numeral_pattern, re.VERBOSE)
+    import random
+    random.seed(9)
+    samples = TO_ROMAN[1:] + [''.join(random.choices('MDCLXVI', k=k))
+                              for k in range(1, 12) for _ in range(5000)]
+    assert all(bool(pattern.search(s)) == is_roman(s) == (s in FROM_ROMAN)
+               for s in samples)
+
+    from timeit import timeit
+    values = [random.randint(1, MAX_ROMAN) for _ in range(100000)]
+    numerals = to_roman_batch(values)
+    print('validate, regex:   ', timeit(lambda: [bool(pattern.search(s))
+                                        for s in numerals], number=1))
+    print('validate, DFA:     ', timeit(lambda: [is_roman(s)
+                                        for s in numerals], number=1))
+    print('validate, lookup:  ', timeit(lambda: validate_batch(numerals),
+                                        number=1))
+    print('convert, by digits:', timeit(lambda: [_to_roman(n)
+                                        for n in values], number=1))
+    print('convert, lookup:   ', timeit(lambda: to_roman_batch(values),
+                                        number=1))
+    print('parse, lookup:     ', timeit(lambda: from_roman_batch(numerals),
+                                        number=1))
+    if np is not None:
+        array = np.array(values)
+        print('convert, array:    ', timeit(lambda: to_roman_batch(array),
+                                            number=1))
+
+
+
+##
+##  END
+##
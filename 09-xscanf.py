@@ -0,0 +1,187 @@
+###############################################################################
+##
+##  PYTHON SCANF DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## The end of that section simulates C's sscanf() by hand: the format
+##     "%s - %d errors, %d warnings"
+## is rewritten as the regex (\S+) - (\d+) errors, (\d+) warnings and the
+## groups are then converted one by one with int(), etc. This is easily
+## automated: a format is compiled (once, then cached) into a regex and a
+## tuple of conversion functions. For whole files, findall() over all the
+## text returns the groups directly, without one Match object per line.
+
+
+import re
+from functools import lru_cache
+
+
+def _c_int(s):                      # C integer literal: 0x1F, 017, 42
+    digits = s.lstrip('+-')
+    if digits[:2] in ('0x', '0X'):
+        value = int(digits, 16)
+    elif digits[:1] == '0' and len(digits) > 1:
+        value = int(digits, 8)
+    else:
+        value = int(digits)
+    return -value if s[:1] == '-' else value
+
+# Conversion specifiers: regex for the field, and conversion function
+SPECIFIERS = {
+    'd': (r'[-+]?\d+', int),
+    'i': (r'[-+]?(?:0[xX][\dA-Fa-f]+|0[0-7]*|[1-9]\d*)', _c_int),
+    'u': (r'\d+', int),
+    'f': (r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?', float),
+    'x': (r'[-+]?(?:0[xX])?[\dA-Fa-f]+', lambda s: int(s, 16)),
+    'o': (r'[-+]?[0-7]+', lambda s: int(s, 8)),
+    's': (r'\S+', str),
+    'c': (r'.', str),
+}
+SPECIFIERS['e'] = SPECIFIERS['g'] = SPECIFIERS['f']
+
+def _digits(digits, width, sign=True):  # at most width chars, sign included
+    if not sign or width == 1:
+        return '%s{1,%d}' % (digits, width)
+    return '(?:[-+]%s{1,%d}|%s{1,%d})' % (digits, width - 1, digits, width)
+
+# Regexes for a maximum field width, e.g. %4d%2d%2d for '20181231' (the
+# widths of %f, %e, %g and %i are not supported: ValueError)
+WIDTHS = {
+    'd': lambda n: _digits(r'\d', n),
+    'u': lambda n: _digits(r'\d', n, sign=False),
+    'x': lambda n: _digits(r'[\dA-Fa-f]', n),
+    'o': lambda n: _digits(r'[0-7]', n),
+    's': lambda n: r'\S{1,%d}' % n,
+    'c': lambda n: '.{%d}' % n,     # %5c: exactly 5 chars
+}
+
+_TOKEN = re.compile(r'%(\d*)([a-z%])|(\s+)|([^%\s]+)')
+
+
+class ScanFormat:
+    """A scanf format compiled into a regex and a tuple of converters."""
+
+    def __init__(self, fmt):
+        self.format = fmt
+        parts, line_parts, converters = [], [], []
+        pos = 0
+        for m in _TOKEN.finditer(fmt):
+            if m.start() != pos:
+                raise ValueError("bad format at %d: %r" % (pos, fmt))
+            pos = m.end()
+            width, spec, space, literal = m.groups()
+            if spec == '%':
+                parts.append('%')
+                line_parts.append('%')
+            elif spec:
+                if spec not in SPECIFIERS:
+                    raise ValueError("unknown specifier %%%s" % spec)
+                regex, convert = SPECIFIERS[spec]
+                if width:
+                    if spec not in WIDTHS or int(width) == 0:
+                        raise ValueError("width not supported: %%%s%s" %
+                                         (width, spec))
+                    regex = WIDTHS[spec](int(width))
+                parts.append('(%s)' % regex)
+                line_parts.append('(%s)' % regex)
+                converters.append(convert)
+            elif space:                 # any whitespace matches any amount
+                parts.append(r'\s*')
+                line_parts.append(r'[^\S\n]*')  # (but not past the line)
+            else:
+                parts.append(re.escape(literal))
+                line_parts.append(re.escape(literal))
+        if pos != len(fmt):
+            raise ValueError("bad format: %r" % fmt)
+        self.pattern = re.compile(''.join(parts))
+        self.converters = tuple(converters)
+        self.lines = re.compile(r'^%s\r?$' % ''.join(line_parts),
+                                re.MULTILINE)       # (\r\n text too)
+        # The conversion of a tuple of groups is itself compiled into one
+        # function, e.g. lambda g: (g[0], f1(g[1]), f2(g[2])), so that no
+        # loop over the converters is needed for each line (cf. section 10)
+        items = ['g[%d]' % i if f is str else 'f%d(g[%d])' % (i, i)
+                 for i, f in enumerate(converters)]
+        self._convert = eval('lambda g: (%s)' % ''.join(item + ', '
+                                                        for item in items),
+                             {'f%d' % i: f for i, f in enumerate(converters)})
+
+    def scan(self, s):
+        """Parses the start of s; returns the tuple of values, or None."""
+        m = self.pattern.match(s)
+        return m and self._convert(m.groups())
+
+    def scan_lines(self, lines):
+        """Yields the values of each line (None for lines that don't match
+        the format); lines may keep their trailing newline."""
+        match, convert = self.pattern.match, self._convert
+        for line in lines:
+            m = match(line)
+            yield m and convert(m.groups())
+
+    def scan_text(self, text):
+        """Returns the values of all the lines of text that match the
+        format entirely, using findall (no Match objects)."""
+        found = self.lines.findall(text)
+        if len(self.converters) == 1:   # findall gives strings, not tuples
+            found = [(g,) for g in found]
+        return list(map(self._convert, found))
+
+    def scan_file(self, filename, encoding=None):
+        with open(filename, encoding=encoding) as f:
+            return self.scan_text(f.read())
+
+
+@lru_cache(maxsize=256)
+def compile_format(fmt):
+    return ScanFormat(fmt)
+
+def sscanf(s, fmt):
+    """Parses s with the scanf format fmt, e.g.
+    sscanf('/usr/sbin/sendmail - 0 errors, 4 warnings',
+           '%s - %d errors, %d warnings') -> ('/usr/sbin/sendmail', 0, 4)"""
+    return compile_format(fmt).scan(s)
+
+
+
+if __name__ == '__main__':
+
+    print(sscanf('/usr/sbin/sendmail - 0 errors, 4 warnings',
+                 '%s - %d errors, %d warnings'))
+    print(sscanf('1:3.0 false,hello', '%d:%f %s'))  # %s: up to a space
+    print(sscanf('0x1F 017 42%', '%i %i %d%%'))
+    print(sscanf('20181231', '%4d%2d%2d'), sscanf('-12345', '%3d%d'),
+          sscanf('08 x', '%i x'))     # ('0' is octal: no 8 after it)
+    print(compile_format('%s - %d errors, %d warnings').pattern.pattern)
+
+    # Bulk: 200000 lines, by hand (section 09 style) vs. compiled format
+    import random
+    from timeit import timeit
+    random.seed(9)
+    text = ''.join('/usr/bin/prog%d - %d errors, %d warnings\n' %
+                   (i, random.randint(0, 9), random.randint(0, 99))
+                   for i in range(200000))
+    lines = text.splitlines(True)
+    fmt = compile_format('%s - %d errors, %d warnings')
+
+    def by_hand():
+        return [tuple(t(s) for t, s in zip((str, int, int),
+                re.search(r'^(\S+) - (\d+) errors, (\d+) warnings$',
+                          line).groups())) for line in lines]
+    assert by_hand() == list(fmt.scan_lines(lines)) == fmt.scan_text(text)
+    pairs = compile_format('%d %d')     # whitespace within a line only
+    for sample in ['1\n2\n3 4\n5  6', '1\r\n2\r\n3 4\r\n5  6\r\n']:
+        found = [v for v in pairs.scan_lines(sample.splitlines(True)) if v]
+        assert found == pairs.scan_text(sample) == [(3, 4), (5, 6)]
+    print('by hand:     ', timeit(by_hand, number=1))
+    print('scan_lines:  ', timeit(lambda: list(fmt.scan_lines(lines)),
+                                  number=1))
+    print('scan_text:   ', timeit(lambda: fmt.scan_text(text), number=1))
+
+
+
+##
+##  END
+##
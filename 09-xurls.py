@@ -0,0 +1,142 @@
+###############################################################################
+##
+##  PYTHON URL SCANNER DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## That section gets the domain extension of a URL with '://.*\.(.*?)/' or
+## with chained split() calls. Both fail on URLs without a '/' after the
+## host, with a port (':8080'), with user info ('user@host'), or with an
+## IPv6 address ('[::1]'), and the regex's greedy .* may even run into the
+## path. urllib.parse handles them, but is slow for log analysis over
+## billions of URLs. A small scanner made of str.find() and str.partition()
+## calls (all in C) is correct on those cases and several times faster than
+## urlsplit(); as the same few hosts appear over and over in logs, each
+## distinct authority (user@host:port) is only parsed once. Results can
+## then be aggregated per host, or per TLD.
+
+
+import re
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit
+
+
+URL = namedtuple('URL', 'scheme host port tld path')
+
+def _split(url):                    # -> scheme, authority, path
+    i = url.find('://')
+    if i < 0:                       # no scheme e.g., 'www.python.org/doc'
+        scheme, rest = '', url
+    else:
+        scheme, rest = url[:i], url[i+3:]
+    end = rest.find('/')            # authority ends at the first / ? #
+    if end < 0: end = len(rest)
+    if '?' in rest or '#' in rest:  # (rare: only then look for them)
+        for c in '?#':
+            j = rest.find(c, 0, end)
+            if j >= 0: end = j
+    return scheme, rest[:end], rest[end:]
+
+def _host(authority):               # -> host, port, tld
+    if '@' in authority:            # drop user:password@
+        authority = authority.rpartition('@')[2]
+    if authority[:1] == '[':        # IPv6 literal e.g., [2001:db8::1]:80
+        host, _, port = authority[1:].partition(']')
+        return host.lower(), port[1:], ''
+    host, _, port = authority.partition(':')
+    host = host.rstrip('.').lower() # 'python.org.' is 'python.org'
+    dot = host.rfind('.')
+    tld = host[dot+1:] if dot >= 0 else ''
+    if tld.isdigit(): tld = ''      # IPv4 address
+    return host, port, tld
+
+def scan_url(url):
+    """Splits a URL into (scheme, host, port, tld, path); port is '' if
+    absent, and tld is '' for IP addresses and single-label hosts."""
+    scheme, authority, path = _split(url)
+    host, port, tld = _host(authority)
+    return URL(scheme.lower(), host, port, tld, path)
+
+def scan_column(urls):
+    """Batch version: returns the columns (schemes, hosts, ports, tlds,
+    paths) of a list of URLs. Each distinct authority (host:port) is only
+    parsed once: in logs, the same few hosts appear over and over."""
+    cache = {}
+    schemes, hosts, ports, tlds, paths = [], [], [], [], []
+    for url in urls:
+        scheme, authority, path = _split(url)
+        parsed = cache.get(authority)
+        if parsed is None:
+            parsed = cache[authority] = _host(authority)
+        schemes.append(scheme.lower())
+        hosts.append(parsed[0])
+        ports.append(parsed[1])
+        tlds.append(parsed[2])
+        paths.append(path)
+    return schemes, hosts, ports, tlds, paths
+
+def per_host(urls):
+    """Aggregation stage: number of requests per host and per TLD. URLs are
+    first counted by raw authority (cheap), then each distinct authority is
+    parsed once."""
+    authorities = Counter(_split(url)[1] for url in urls)
+    hosts, tlds = Counter(), Counter()
+    for authority, n in authorities.items():
+        host, _, tld = _host(authority)
+        hosts[host] += n
+        if tld: tlds[tld] += n
+    return hosts, tlds
+
+
+
+if __name__ == '__main__':
+
+    urls = ['http://docs.python.org/3/tutorial/interpreter.html',
+            'HTTPS://www.python.org',
+            'https://www.python.org:8080/downloads/',
+            'ftp://user:pw@ftp.example.co.uk/pub/file.txt',
+            'http://[2001:db8::1]:8080/index.html',
+            'http://192.168.0.1/admin',
+            'http://localhost:8000/?q=a.b/c',
+            'www.example.com/no/scheme']
+    tld_pattern = re.compile(r'://.*\.(.*?)/')
+    for url in urls:
+        found = tld_pattern.findall(url)
+        print('%-52s regex: %-12r scanner: %r' %
+              (url, found[0] if found else None, scan_url(url).tld))
+    print(scan_url(urls[4]))
+    assert list(zip(*scan_column(urls))) == list(map(scan_url, urls))
+
+    # Benchmark on 300000 log URLs: regex, urllib.parse, scanner
+    import random
+    from time import perf_counter
+    random.seed(9)
+    hosts = ['www.python.org', 'docs.python.org', 'pypi.org', 'github.com',
+             'example.co.uk', 'news.bbc.co.uk', 'localhost:8000',
+             '10.0.0.1', '[::1]:8080', 'www.uni.edu']
+    log = ['%s://%s/%s/page%d.html?id=%d' % (random.choice(['http', 'https']),
+           random.choice(hosts), random.choice(['a', 'b', 'c']),
+           random.randint(1, 99), random.randint(1, 9999))
+           for _ in range(300000)]
+
+    t = perf_counter()
+    [tld_pattern.findall(url) for url in log]
+    print('regex:        %.2fs' % (perf_counter() - t))
+    t = perf_counter()
+    [(p.scheme, p.hostname, p.port, p.path) for p in map(urlsplit, log)]
+    print('urllib.parse: %.2fs' % (perf_counter() - t))
+    t = perf_counter()
+    schemes, hosts_, ports, tlds, paths = scan_column(log)
+    print('scanner:      %.2fs' % (perf_counter() - t))
+    t = perf_counter()
+    by_host, by_tld = per_host(log)
+    print('per host:     %.2fs' % (perf_counter() - t))
+    print(by_host.most_common(3))
+    print(by_tld.most_common())
+
+
+
+##
+##  END
+##
@@ -0,0 +1,153 @@
+###############################################################################
+##
+##  PYTHON WORD COUNT DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 09 (Regular Expressions).
+## That section splits text into words with re.compile(r'\W+').split(...),
+## and section 02 counts things with a Counter. Counting the words of a big
+## corpus that way reads each whole file, builds the list of all its words,
+## and uses a single core. Here, the files are cut into chunks of ~16 MB
+## ending at line ends (a word never straddles two chunks); the chunks are
+## shared between worker processes, each of which reads its chunks through
+## mmap (no copy of the file in the parent), finds the words of one chunk at
+## a time with the compiled pattern, and keeps a single Counter. The Counters
+## are then merged in a tree, by pairs, in the workers too. Tokens/s and the
+## peak memory (resident set size, RSS) of the parent and workers are shown.
+## Usage:  python 09-xwordcount.py [-w workers] file ...
+## (without any file, a test corpus is generated and counted both ways)
+
+
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+try:
+    import resource                 # Unix only
+except ImportError:
+    resource = None
+
+
+WORD = re.compile(r'\w+')           # findall(\w+) = split(\W+), less ''s
+
+def line_chunks(filename, chunk_size=1 << 24):
+    """Splits a file into (start, end) regions of about chunk_size bytes,
+    ending at line ends."""
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        while bounds[-1] + chunk_size < size:
+            f.seek(bounds[-1] + chunk_size)
+            f.readline()            # move to the end of the current line
+            bounds.append(f.tell())
+    if size: bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+def _count_job(job):                # top-level, so that it can be pickled
+    pattern, ranges, lower, encoding = job
+    counts = Counter()              # one Counter per worker, for all chunks
+    for filename, start, end in ranges:
+        with open(filename, 'rb') as f, \
+             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            text = m[start:end].decode(encoding, errors='replace')
+        if lower: text = text.lower()
+        counts.update(pattern.findall(text))
+    return counts
+
+def _merge(a, b):                   # top-level, so that it can be pickled
+    a.update(b)
+    return a
+
+def merge_tree(counters, pool=None):
+    """Merges Counters by pairs, then pairs of pairs, etc.: with a pool,
+    the merges of each level run in parallel."""
+    while len(counters) > 1:
+        left, right = counters[0::2], counters[1::2]
+        merged = list((pool.map if pool else map)(_merge, left, right))
+        counters = merged + left[len(right):]   # (odd one out, if any)
+    return counters[0] if counters else Counter()
+
+def count_words(filenames, workers=None, chunk_size=1 << 24, lower=True,
+                pattern=WORD, encoding='utf-8'):
+    """Returns the Counter of the words in all the files."""
+    workers = workers or os.cpu_count() or 1
+    ranges = [(name, a, b) for name in filenames
+              for a, b in line_chunks(name, chunk_size)]
+    jobs = [(pattern, ranges[i::workers], lower, encoding)
+            for i in range(min(workers, len(ranges)))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_tree(list(pool.map(_count_job, jobs)), pool)
+
+def peak_rss():
+    """Returns the peak RSS, in MB, of this process and of its largest
+    (finished) child process; None if unknown."""
+    if resource is None: return None
+    unit = 1 if sys.platform == 'darwin' else 1024  # bytes on macOS, else KB
+    return tuple(resource.getrusage(who).ru_maxrss * unit / 2**20
+                 for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+
+def report(counts, seconds, top=10):
+    tokens = sum(counts.values())
+    print('%d tokens, %d distinct, in %.2fs: %.1fM tokens/s' %
+          (tokens, len(counts), seconds, tokens / seconds / 1e6))
+    rss = peak_rss()
+    if rss: print('peak RSS: %.0f MB (main), %.0f MB (workers)' % rss)
+    for word, n in counts.most_common(top):
+        print('%10d  %s' % (n, word))
+
+def main(args):
+    workers = None
+    if args[:1] == ['-w']:
+        workers, args = int(args[1]), args[2:]
+    start = perf_counter()
+    counts = count_words(args, workers)
+    report(counts, perf_counter() - start)
+
+
+
+if __name__ == '__main__':          # (needed on Windows for multiprocessing)
+
+    if len(sys.argv) > 1:
+        main(sys.argv[1:])
+    else:
+        import random
+        import tempfile
+        random.seed(9)
+        vocabulary = ['w%d' % i for i in range(5000)] + \
+                     'the of and to a in is it that for'.split()
+        weights = [1] * 5000 + [200] * 10
+        with tempfile.TemporaryDirectory() as tmp:
+            filenames = []
+            for i in range(4):      # 4 files of ~10 MB
+                name = os.path.join(tmp, 'corpus%d.txt' % i)
+                with open(name, 'w') as f:
+                    for _ in range(200):
+                        words = random.choices(vocabulary, weights, k=10000)
+                        f.writelines(' '.join(words[j:j+12]) + ', etc.\n'
+                                     for j in range(0, 10000, 12))
+                filenames.append(name)
+
+            start = perf_counter()  # (first, for the peak RSS of main)
+            counts = count_words(filenames, chunk_size=1 << 22)
+            report(counts, perf_counter() - start, top=3)
+
+            start = perf_counter()  # the section 02 + 09 way, one by one
+            p1 = re.compile(r'\W+')
+            expected = Counter()
+            for name in filenames:
+                with open(name) as f:
+                    expected.update(w for w in p1.split(f.read().lower())
+                                    if w)
+            print('split + Counter: %.2fs' % (perf_counter() - start))
+            print(counts == expected)
+
+
+
+##
+##  END
+##
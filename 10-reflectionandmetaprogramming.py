@@ -91,6 +91,10 @@ save_file("report")
 save_file("report", "pdf")
 save_file("report", "xyz")          # no match, default is used
 
+# (for millions of calls, and plugins in separate modules imported only when
+# needed, see the registry in 10-xplugins.py; and for real writers of these
+# formats, streaming large reports to several files at once, 10-xexporters.py)
+
 
 
 ################################
@@ -226,6 +230,9 @@ class StringFunction_compiled:      # faster with a compiled expression!
     def __call__(self, x):
         return eval(self._compiled_expr)
 
+# (thousands of instances sharing a few formulas? see 10-xcompilecache.py for
+# a cache of compiled code shared by all, which also optimises the formulas)
+
 import time
 
 # Comparing performance: interpreted vs. compiled code
@@ -253,6 +260,8 @@ timefc('atan(tan(atan(tan(atan(tan(atan(tan(x))))))))')
 
 # So we can do numerical calculations in Python with the performance of C!
 # e.g., numpy module: all its functions are compiled, not interpreted.
+# (see 10-xformulas.py for compiling such formulas into numpy functions that
+# compute a whole array of values at once, and a timefc() comparing all 3)
 
 
 # note: 'exec' actually compiles the Python code passed as argument (string)
@@ -310,6 +319,8 @@ def timefact():
 # note: All Python code imported from a module is automatically compiled the
 # first time (or if the module file has changed) to a .pyc file. Code in the
 # main is not compiled, unless explicitly as illustrated above.
+# (for code given as text to exec(), see 10-xsnippetcache.py: compiled code
+# saved in files too, so that it is only compiled once, not at every run)
 
 
 
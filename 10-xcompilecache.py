@@ -0,0 +1,301 @@
+###############################################################################
+##
+##  PYTHON COMPILE CACHE DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 10 (Meta-programming).
+## Each StringFunction_compiled of that section calls compile() on its
+## formula, even when thousands of them share the same formula. Here, one
+## cache for the whole program (process) keeps the compiled code of the most
+## recently used formulas, keyed by their normalised text: 'sin( 2*x )' and
+## 'sin(2 * x)' are the same formula, as the text is parsed and written back
+## by the ast module. Before compiling, the syntax tree is optimised:
+## - constant folding: 2*pi/360 is computed once, at compile time (Python
+##   itself folds 2*3, but not pi/180 nor sin(1), which depend on names);
+## - common subexpressions: in sin(x/2)**2 + cos(x/2)**2, x/2 is computed
+##   once, kept in a temporary variable with :=, then reused. (Like any
+##   assignment in eval(), the temporaries go into the namespace given for
+##   the local variables, or else the globals; they are named after the
+##   cache's id, e.g. _cse7f08c2d0_0, so as not to replace any variable.)
+## The cache counts hits, misses and the time spent compiling, so that the
+## time saved can be estimated. (Names such as pi and sin are assumed to be
+## math's, as with 'from math import *'.)
+
+
+import ast
+import math
+from collections import OrderedDict
+from threading import Lock
+from time import perf_counter
+
+
+CONSTANTS = {'pi': math.pi, 'e': math.e, 'tau': math.tau}
+PURE_FUNCTIONS = {name: getattr(math, name) for name in
+                  ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2',
+                   'sinh', 'cosh', 'tanh', 'exp', 'log', 'log10', 'log2',
+                   'sqrt', 'fabs', 'floor', 'ceil', 'hypot', 'pow',
+                   'degrees', 'radians']}
+_NUMBERS = (int, float, complex)
+
+def _is_number(node):
+    return isinstance(node, ast.Constant) and type(node.value) in _NUMBERS
+
+
+class ConstantFolder(ast.NodeTransformer):
+    """Replaces operations on constants by their value."""
+
+    def __init__(self, constants=CONSTANTS, functions=PURE_FUNCTIONS):
+        self.constants, self.functions = constants, functions
+        self.folded = 0
+
+    def _fold(self, node, compute):
+        try:
+            value = compute()
+        except (ArithmeticError, ValueError, TypeError):
+            return node             # e.g. 1/0: leave it for run time
+        self.folded += 1
+        return ast.copy_location(ast.Constant(value), node)
+
+    def visit_Name(self, node):
+        if node.id in self.constants and isinstance(node.ctx, ast.Load):
+            return self._fold(node, lambda: self.constants[node.id])
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)    # fold the operands first
+        if _is_number(node.left) and _is_number(node.right):
+            a, b = node.left.value, node.right.value
+            if isinstance(node.op, (ast.Pow, ast.LShift)) and \
+               isinstance(b, int) and abs(b) > 64:
+                return node         # (don't build huge numbers)
+            code = compile(ast.Expression(node), '<fold>', 'eval')
+            return self._fold(node, lambda: eval(code, {}))
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if _is_number(node.operand):
+            code = compile(ast.Expression(node), '<fold>', 'eval')
+            return self._fold(node, lambda: eval(code, {}))
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id in \
+           self.functions and not node.keywords and \
+           all(_is_number(a) for a in node.args):
+            func = self.functions[node.func.id]
+            return self._fold(node, lambda: func(*[a.value for a in
+                                                   node.args]))
+        return node
+
+
+# Common subexpressions: only expressions made of names, numbers, operators
+# and calls of pure functions can be reused safely. Each one seen more than
+# once gets a temporary: (_cse_0 := x / 2) where it is first computed (Python
+# evaluates operands from left to right), _cse_0 everywhere else.
+
+_SAFE = (ast.BinOp, ast.UnaryOp, ast.Name, ast.Constant, ast.Load,
+         ast.operator, ast.unaryop)
+
+def _reusable(node, functions):
+    if isinstance(node, (ast.Name, ast.Constant)):
+        return False                # (nothing to save)
+    for n in ast.walk(node):
+        if isinstance(n, ast.Call):
+            if not (isinstance(n.func, ast.Name) and n.func.id in functions
+                    and not n.keywords):
+                return False
+        elif not isinstance(n, _SAFE):
+            return False
+    return True
+
+class CommonSubexpressions(ast.NodeTransformer):
+
+    def __init__(self, tree, functions=PURE_FUNCTIONS, prefix='_cse_'):
+        self.prefix = prefix        # of the names of the temporaries
+        self.counts = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.expr) and _reusable(node, functions):
+                key = ast.dump(node)
+                self.counts[key] = self.counts.get(key, 0) + 1
+        self.temps = {}             # dump of subexpression -> variable name
+
+    def visit(self, node):
+        if not isinstance(node, ast.expr):
+            return self.generic_visit(node)
+        key = ast.dump(node)
+        name = self.temps.get(key)
+        if name is not None:        # already computed: reuse it
+            return ast.copy_location(ast.Name(name, ast.Load()), node)
+        if self.counts.get(key, 0) > 1:
+            name = self.temps[key] = '%s%d' % (self.prefix, len(self.temps))
+            node = self.generic_visit(node)
+            return ast.copy_location(ast.NamedExpr(ast.Name(name,
+                                     ast.Store()), node), node)
+        return self.generic_visit(node)
+
+def _unwrap_unused(tree):           # (x := e) -> e if x is never read
+    used = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and
+            isinstance(n.ctx, ast.Load)}
+    class Unwrap(ast.NodeTransformer):
+        def visit_NamedExpr(self, node):
+            self.generic_visit(node)
+            return node if node.target.id in used else node.value
+    return Unwrap().visit(tree)
+
+def optimise(tree, prefix='_cse_'):
+    """Returns the optimised tree, and the numbers of constants folded and
+    of subexpressions reused. The temporaries for the subexpressions are
+    named prefix + number; they are assigned in the namespace the code is
+    run in (the locals given to eval(), or its globals). Only single
+    expressions are optimised, and only if they assign no name and have
+    no scope of their own: otherwise e.g. pi or x + 1 may not be the same
+    everywhere (x = 1; y = x + 1; x = 2; z = x + 1), and tree is returned
+    as is."""
+    if not isinstance(tree, ast.Expression) or any(
+           isinstance(n, (ast.Store, ast.Lambda, ast.comprehension))
+           for n in ast.walk(tree)):
+        return tree, 0, 0
+    folder = ConstantFolder()
+    tree = folder.visit(tree)
+    if any(isinstance(n, (ast.BoolOp, ast.IfExp)) for n in ast.walk(tree)):
+        return tree, folder.folded, 0   # (may skip parts: no temporaries)
+    cse = CommonSubexpressions(tree, prefix=prefix)
+    tree = _unwrap_unused(cse.visit(tree))
+    reused = sum(1 for n in ast.walk(tree) if isinstance(n, ast.NamedExpr))
+    return ast.fix_missing_locations(tree), folder.folded, reused
+
+
+class CodeCache:
+    """Bounded (LRU) cache of compiled formulas, shared by the program."""
+
+    def __init__(self, maxsize=1024, optimise=True):
+        self.maxsize = maxsize
+        self.optimise = optimise
+        self.codes = OrderedDict()  # text (raw or normalised) -> code
+        self.hits = self.misses = 0
+        self.folded = self.reused = 0
+        self.compile_time = 0.0     # total time spent on misses (s)
+        self.prefix = '_cse%x_' % id(self)  # (temporaries: no name clash)
+        self._lock = Lock()         # (threads may share the cache)
+
+    def _store(self, key, code):
+        self.codes[key] = code
+        if len(self.codes) > self.maxsize:
+            self.codes.popitem(last=False)  # least recently used
+
+    def compile(self, expression, mode='eval'):
+        """Returns the code of expression, compiling it if not cached."""
+        with self._lock:
+            code = self.codes.get((expression, mode))
+            if code is not None:
+                self.codes.move_to_end((expression, mode))
+                self.hits += 1
+                return code
+            tree = ast.parse(expression, mode=mode)
+            key = (ast.unparse(tree), mode)     # normalised text
+            code = self.codes.get(key)
+            if code is not None:    # same formula, written differently
+                self.hits += 1
+            else:
+                start = perf_counter()
+                self.misses += 1
+                if self.optimise and mode == 'eval':
+                    tree, folded, reused = optimise(tree, self.prefix)
+                    self.folded += folded
+                    self.reused += reused
+                code = compile(tree, '<formula>', mode)
+                self._store(key, code)
+                self.compile_time += perf_counter() - start
+            self._store((expression, mode), code)
+            return code
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        misses = self.misses or 1
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit rate': round(self.hit_rate(), 4), 'size': len(self.codes),
+                'compile time': round(self.compile_time, 6),
+                'saved time (estimate)': round(self.hits * self.compile_time
+                                               / misses, 6),
+                'constants folded': self.folded,
+                'subexpressions reused': self.reused}
+
+    def clear(self):
+        with self._lock:
+            self.codes.clear()
+
+
+cache = CodeCache()                 # the cache of the whole program
+compile_formula = cache.compile
+MATH_NAMESPACE = dict(vars(math))   # (eval() adds __builtins__ to globals:
+                                    # a copy, not math's own namespace)
+
+
+class StringFunction_compiled:      # section 10's, with the shared cache
+    def __init__(self, expression):
+        self._compiled_expr = compile_formula(expression)
+
+    def __call__(self, x):
+        return eval(self._compiled_expr, MATH_NAMESPACE, {'x': x})
+
+
+
+if __name__ == '__main__':
+
+    for formula in ['sin(2*pi/360*x)**2 + cos(2*pi/360*x)**2',
+                    'sin(x/2)**2 + cos(x/2)**2 + sqrt(2)*(x/2)',
+                    'exp(-x*x/2) / sqrt(2*pi)', '1 if x > 0 else -(1/3)']:
+        tree, folded, reused = optimise(ast.parse(formula, mode='eval'))
+        optimised = compile(tree, '', 'eval')
+        assert all(math.isclose(eval(formula, MATH_NAMESPACE, {'x': x}),
+                                eval(optimised, MATH_NAMESPACE, {'x': x}))
+                   for x in [-1.5, 0.25, 3.0])
+        print('%-44s -> %s' % (formula, ast.unparse(tree)))
+
+    # 10000 functions using 20 formulas, written in different ways
+    import random
+    random.seed(9)
+    formulas = ['%d*sin(x)**2 + cos( x/%d )*(2*pi/360)' % (i, i + 1)
+                for i in range(20)]
+    texts = [random.choice(formulas).replace(' ', ' ' * random.randint(0, 1))
+             for _ in range(10000)]
+    start = perf_counter()
+    plain = [compile(text, '<string>', 'eval') for text in texts]
+    print('compile() each time: %.3fs' % (perf_counter() - start))
+    start = perf_counter()
+    functions = [StringFunction_compiled(text) for text in texts]
+    print('shared cache:        %.3fs' % (perf_counter() - start))
+    print(cache.stats())
+
+    # Running faster too: sqrt(x*x + 1) and the constants computed once
+    from timeit import timeit
+    formula = ('sqrt(x*x + 1) / (1 + sqrt(x*x + 1)) + log(sqrt(x*x + 1)) '
+               '* sin(pi/4) / sqrt(2*pi)')
+    names, setup = MATH_NAMESPACE, {'x': 0.5}
+    code = compile(formula, '<string>', 'eval')
+    print('plain:     %.3fs' % timeit(lambda: eval(code, names, setup),
+                                      number=200000))
+    code = compile_formula(formula)
+    print('optimised: %.3fs' % timeit(lambda: eval(code, names, setup),
+                                      number=200000))
+    for program in ['x = 1\ny = x + 1\nx = 2\nz = x + 1',
+                    'e = 5\nr = e * 2']:     # statements: not optimised
+        names = {}
+        exec(compile_formula(program, 'exec'), dict(MATH_NAMESPACE), names)
+        print(names)
+    g = dict(MATH_NAMESPACE, x=0.5)  # no locals: temporaries go in globals
+    eval(code, g)
+    print(sorted(name for name in g if name.startswith('_cse')),
+          hasattr(math, '__builtins__'))
+
+
+
+##
+##  END
+##
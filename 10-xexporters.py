@@ -0,0 +1,316 @@
+###############################################################################
+##
+##  PYTHON STREAMING EXPORT DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 10 (Meta-programming).
+## The SavePlugin of that section only prints 'Saved HTML file', etc. Here
+## are real writers for HTML, PDF, RTF and text, for reports too large to be
+## built in memory as one document: the records (rows of values) are written
+## out as they come, by batches. The encoded text is gathered in a buffer and
+## written in large blocks (1 MB), so there are few system calls. Even the
+## PDF is streamed, one page at a time: the positions of its objects, needed
+## at the end of the file, are counted while writing. export() produces any
+## number of formats from a single pass over the records, e.g. a generator
+## that can't be restarted: each batch is handed to one thread per format.
+## (Formatting is Python code, so the threads share one core because of the
+## GIL; but writes to disk release it, and the records are read only once.)
+## save_as_html() etc. can be registered as plugins, see 10-xplugins.py.
+
+
+import html
+from itertools import islice
+from queue import Queue
+from threading import Thread
+
+
+class Writer:
+    """Base class: buffered, streaming writer of rows to a file."""
+
+    extension = '.txt'
+    encoding = 'utf-8'
+
+    def __init__(self, name, columns=None, block_size=1 << 20):
+        self.file = open(name + self.extension, 'wb')
+        self.name = self.file.name
+        self.block_size = block_size
+        self.written = 0            # bytes so far, including the buffer
+        self._parts, self._size = [], 0
+        self.begin(columns)
+
+    def _emit(self, text):
+        data = text.encode(self.encoding, 'replace')
+        self._parts.append(data)
+        self._size += len(data)
+        self.written += len(data)
+        if self._size >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(b''.join(self._parts))
+        self._parts, self._size = [], 0
+
+    def begin(self, columns):       # header, if any
+        pass
+
+    def format_rows(self, rows):
+        return ''.join('\t'.join(map(str, row)) + '\n' for row in rows)
+
+    def write_rows(self, rows):
+        self._emit(self.format_rows(rows))
+
+    def write_row(self, row):
+        self.write_rows((row,))
+
+    def end(self):                  # footer, if any
+        pass
+
+    def close(self):
+        if not self.file.closed:
+            self.end()
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TxtWriter(Writer):
+    """Tab-separated lines."""
+
+    def begin(self, columns):
+        if columns: self._emit('\t'.join(columns) + '\n')
+
+
+class HtmlWriter(Writer):
+    extension = '.htm'
+
+    def begin(self, columns):
+        self._emit('<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+                   '<title>%s</title></head>\n<body><table>\n' %
+                   html.escape(self.name))
+        if columns:
+            self._emit('<tr>%s</tr>\n' % ''.join('<th>%s</th>' %
+                       html.escape(c) for c in columns))
+
+    def format_rows(self, rows):
+        escape = html.escape
+        return ''.join('<tr><td>%s</td></tr>\n' % '</td><td>'.join(
+                       escape(str(v), False) for v in row) for row in rows)
+
+    def end(self):
+        self._emit('</table></body></html>\n')
+
+
+_RTF_ESCAPES = str.maketrans({'\\': '\\\\', '{': '\\{', '}': '\\}'})
+
+def _rtf_char(c):                   # \uN? where N is a signed 16-bit code
+    n = ord(c)
+    if n > 65535: return '?'
+    return '\\u%d?' % (n - 65536 if n > 32767 else n)
+
+def _rtf_escape(s):
+    s = s.translate(_RTF_ESCAPES)
+    if s.isascii(): return s
+    return ''.join(c if c < '\x80' else _rtf_char(c) for c in s)
+
+
+class RtfWriter(Writer):
+    extension = '.rtf'
+    encoding = 'ascii'
+
+    def begin(self, columns):
+        self._emit('{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Courier New;}}'
+                   '\\f0\\fs18\n')
+        if columns: self.write_rows([columns])
+
+    def format_rows(self, rows):
+        text = _rtf_escape(''.join('\t'.join(map(str, row)) + '\n'
+                                   for row in rows))
+        return text.replace('\t', '\\tab ').replace('\n', '\\par\n')
+
+    def end(self):
+        self._emit('}\n')
+
+
+_PDF_ESCAPES = str.maketrans({'\\': '\\\\', '(': '\\(', ')': '\\)'})
+
+class PdfWriter(Writer):
+    """A minimal PDF (1.4): text lines in Courier, US Letter pages. Objects
+    1 and 2 are the catalog and the page tree, written last as they list
+    all the pages; 3 is the font; each page then takes two objects."""
+
+    extension = '.pdf'
+    encoding = 'latin-1'            # (other characters become '?')
+    lines_per_page = 66
+
+    def begin(self, columns):
+        self.offsets = {}           # object number -> position in the file
+        self.pages = []             # object numbers of the pages
+        self.lines = []             # lines of the current page
+        self.header = columns and '  '.join(columns)
+        self._emit('%PDF-1.4\n')
+        self._object(3, '<< /Type /Font /Subtype /Type1 '
+                        '/BaseFont /Courier >>')
+
+    def _object(self, number, body):
+        self.offsets[number] = self.written
+        self._emit('%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def _page(self):
+        text = ''.join('(%s) \'\n' % line.translate(_PDF_ESCAPES)
+                       for line in self.lines)
+        stream = 'BT /F1 9 Tf 11 TL 36 770 Td\n%sET' % text
+        number = 4 + 2 * len(self.pages)
+        self._object(number, '<< /Length %d >>\nstream\n%s\nendstream' %
+                             (len(stream.encode('latin-1', 'replace')),
+                              stream))
+        self._object(number + 1, '<< /Type /Page /Parent 2 0 R /MediaBox '
+                     '[0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> '
+                     '/Contents %d 0 R >>' % number)
+        self.pages.append(number + 1)
+        self.lines = []
+
+    def write_rows(self, rows):
+        for row in rows:
+            if not self.lines and self.header:
+                self.lines.append(self.header)
+            self.lines.append('  '.join(map(str, row)))
+            if len(self.lines) == self.lines_per_page:
+                self._page()
+
+    def end(self):
+        if self.lines or not self.pages:
+            self._page()
+        self._object(1, '<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(2, '<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                     ' '.join('%d 0 R' % n for n in self.pages),
+                     len(self.pages)))
+        xref = self.written
+        self._emit('xref\n0 %d\n0000000000 65535 f \n' % (len(self.offsets)
+                   + 1) + ''.join('%010d 00000 n \n' % self.offsets[n]
+                                  for n in sorted(self.offsets)))
+        self._emit('trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n'
+                   '%%%%EOF\n' % (len(self.offsets) + 1, xref))
+
+
+WRITERS = {'html': HtmlWriter, 'pdf': PdfWriter, 'rtf': RtfWriter,
+           'txt': TxtWriter}
+
+
+def _drain(writer, queue, errors):  # thread: write the batches it's given
+    while True:
+        rows = queue.get()
+        if rows is None: return
+        if not errors:              # (after an error, just empty the queue)
+            try:
+                writer.write_rows(rows)
+            except Exception as e:
+                errors.append(e)
+
+def export(records, name, formats=('txt',), columns=None, batch=1000,
+           threads=True, depth=8):
+    """Writes the records (rows) to name.htm, name.pdf, etc. in one pass;
+    unknown formats give text. Returns the list of the file names."""
+    writers = [WRITERS.get(fmt, TxtWriter)(name, columns) for fmt in formats]
+    batches = iter(lambda it=iter(records): list(islice(it, batch)), [])
+    try:
+        if not threads or len(writers) == 1:
+            for rows in batches:
+                for writer in writers:
+                    writer.write_rows(rows)
+        else:
+            errors = []
+            queues = [Queue(depth) for _ in writers]
+            workers = [Thread(target=_drain, args=(w, q, errors))
+                       for w, q in zip(writers, queues)]
+            for worker in workers:
+                worker.start()
+            try:
+                for rows in batches:
+                    if errors: break
+                    for queue in queues:
+                        queue.put(rows)
+            finally:
+                for queue in queues:
+                    queue.put(None)
+                for worker in workers:
+                    worker.join()
+            if errors:
+                raise errors[0]
+    finally:
+        for writer in writers:
+            writer.close()
+    return [writer.name for writer in writers]
+
+
+# Plugin functions, as in section 10's SavePlugin (with the data to save)
+def save_as_html(name, records=(), columns=None):
+    return export(records, name, ['html'], columns)[0]
+
+def save_as_pdf(name, records=(), columns=None):
+    return export(records, name, ['pdf'], columns)[0]
+
+def save_as_rtf(name, records=(), columns=None):
+    return export(records, name, ['rtf'], columns)[0]
+
+def save_as_txt(name, records=(), columns=None):
+    return export(records, name, ['txt'], columns)[0]
+
+def save_file(name, ext='txt', records=(), columns=None):
+    """Same as section 10's, but ext may also be a list of formats."""
+    formats = [ext] if isinstance(ext, str) else ext
+    return export(records, name, formats, columns)
+
+
+
+if __name__ == '__main__':
+
+    import os
+    import tempfile
+    import tracemalloc
+    from time import perf_counter
+
+    def report(n):                  # a generator: can be read only once
+        for i in range(n):
+            yield (i, 'Customer #%d' % (i % 997), '%.2f' % (i * 3.25 % 1000),
+                   '2018-%02d-%02d' % (i % 12 + 1, i % 28 + 1))
+    columns = ['id', 'name', 'amount', 'date']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.join(tmp, 'report')
+        print(save_file(name, 'pdf', [(1, 'Über & <Co>', '(9.99)', '{x}')],
+                        columns))
+        with open(name + '.pdf', 'rb') as f:
+            print(f.read()[:60])
+
+        n = 200000
+        for threads in (False, True):
+            start = perf_counter()
+            files = export(report(n), name, ['html', 'pdf', 'rtf', 'txt'],
+                           columns, threads=threads)
+            print('%d rows, 4 formats, threads=%s: %.2fs' %
+                  (n, threads, perf_counter() - start))
+        tracemalloc.start()         # memory stays small, whatever n
+        export(report(n), name, ['html', 'pdf', 'rtf', 'txt'], columns)
+        print('peak memory: %.1f MB' % (tracemalloc.get_traced_memory()[1]
+                                        / 2**20))
+        tracemalloc.stop()
+        for filename in files:
+            print('%8.1f MB  %s' % (os.path.getsize(filename) / 2**20,
+                                    os.path.basename(filename)))
+
+        start = perf_counter()      # one format at a time: 4 passes
+        for fmt in ['html', 'pdf', 'rtf', 'txt']:
+            export(report(n), name, [fmt], columns)
+        print('4 passes, one per format: %.2fs' % (perf_counter() - start))
+
+
+
+##
+##  END
+##
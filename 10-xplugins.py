@@ -0,0 +1,194 @@
+###############################################################################
+##
+##  PYTHON PLUGIN REGISTRY DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 10 (Meta-programming).
+## save_file() in that section creates a new SavePlugin and looks up the
+## method 'save_as_' + ext with getattr() at each call. That is fine once,
+## but not for millions of calls; and all the plugins must be in one class,
+## loaded at start. Here, a registry maps each format to its function in a
+## dict, so a call costs a single dict lookup. Plugins are declared in a
+## manifest, in the same format as the entry points of installed packages
+## (entry_points.txt, an INI file: 'format = module:function' lines under a
+## [group] section), and each module is only imported when its format is
+## first used, then kept in the dict: starting up only reads the manifest.
+## Installed packages can also declare plugins, in their own entry points.
+
+
+import configparser
+import importlib
+import importlib.util
+import os
+from functools import reduce
+
+
+class SavePlugin(object):
+    """Same as section 10's, but returns the file name (no printing)."""
+
+    def save_as_html(self, name):
+        return name + ".htm"
+
+    def save_as_pdf(self, name):
+        return name + ".pdf"
+
+    def save_as_rtf(self, name):
+        return name + ".rtf"
+
+    def save_as_txt(self, name):
+        return name + ".txt"
+
+def save_file(name, ext = 'txt'):   # section 10's dispatcher, for comparison
+    plugin = SavePlugin()
+    return getattr(plugin, 'save_as_' + ext, plugin.save_as_txt)(name)
+
+
+def load_object(reference):
+    """Returns the object for 'module:attribute' (entry point syntax),
+    importing module if needed; module may also be the path of a .py file,
+    e.g. '10-xexporters.py:save_as_html' (not a valid module name)."""
+    module_name, _, attribute = reference.partition(':')
+    module_name = module_name.strip()
+    if module_name.endswith('.py'):
+        name = os.path.basename(module_name)[:-3].replace('-', '_')
+        spec = importlib.util.spec_from_file_location(name, module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    if not attribute: return module
+    return reduce(getattr, attribute.strip().split('.'), module)
+
+
+class PluginRegistry:
+    """Maps formats to functions, importing plugin modules on first use."""
+
+    def __init__(self, group='tutorial.save_plugins', default='txt'):
+        self.group = group
+        self.default = default
+        self.references = {}        # format -> 'module:function', not loaded
+        self.table = {}             # format -> function (dispatch dict)
+        self.loaded = []            # formats loaded so far, in order
+
+    def register(self, fmt, func):
+        """Registers a function, or a 'module:function' reference."""
+        if isinstance(func, str):
+            self.references[fmt] = func
+            self.table.pop(fmt, None)
+        else:
+            self.table[fmt] = func
+
+    def register_methods(self, obj, prefix='save_as_'):
+        """Registers the methods of obj named prefix + format (by reflection,
+        once for all), e.g. SavePlugin().save_as_pdf for 'pdf'."""
+        for name in dir(obj):
+            if name.startswith(prefix):
+                self.register(name[len(prefix):], getattr(obj, name))
+
+    def load_manifest(self, filename):
+        """Reads the references of self.group in an entry-points file."""
+        parser = configparser.ConfigParser(delimiters=('=',))
+        parser.optionxform = str    # keep the case of the formats
+        parser.read(filename)
+        if parser.has_section(self.group):
+            for fmt, reference in parser.items(self.group):
+                self.register(fmt, reference)
+
+    def discover(self):
+        """Reads the references of self.group in installed packages."""
+        from importlib.metadata import entry_points
+        found = entry_points()
+        if hasattr(found, 'select'):    # Python 3.10+
+            found = found.select(group=self.group)
+        else:
+            found = found.get(self.group, [])
+        for entry in found:
+            self.register(entry.name, entry.value)
+
+    def _load(self, fmt):
+        reference = self.references.get(fmt)
+        if reference is None:
+            if fmt != self.default: # unknown format: the default's, not
+                return self.get(self.default)   # stored (table stays bounded)
+            raise LookupError("no plugin for the default format %r" % fmt)
+        func = self.table[fmt] = load_object(reference)
+        self.loaded.append(fmt)
+        return func
+
+    def get(self, fmt):
+        """Returns the function for fmt (that of default if unknown)."""
+        try:
+            return self.table[fmt]
+        except KeyError:
+            return self._load(fmt)
+
+    def save(self, name, fmt='txt'):
+        try:
+            func = self.table[fmt]
+        except KeyError:
+            func = self._load(fmt)
+        return func(name)
+
+    def formats(self):
+        return sorted(set(self.table) | set(self.references))
+
+
+
+if __name__ == '__main__':
+
+    # Plugins in one class, registered once by reflection
+    registry = PluginRegistry()
+    registry.register_methods(SavePlugin())
+    print(registry.save("report"), registry.save("report", "pdf"),
+          registry.save("report", "xyz"))
+
+    # Plugins in separate modules, declared in a manifest, loaded lazily
+    import sys
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ['html', 'pdf', 'rtf', 'txt']:
+            with open(os.path.join(tmp, 'save%s.py' % fmt), 'w') as f:
+                f.write('print("(importing the %s plugin)")\n'
+                        'def save(name):\n'
+                        '    return name + ".%s"\n' % (fmt.upper(), fmt))
+        manifest = os.path.join(tmp, 'entry_points.txt')
+        with open(manifest, 'w') as f:
+            f.write('[tutorial.save_plugins]\n' + ''.join(
+                    '%s = save%s:save\n' % (fmt, fmt) for fmt in
+                    ['html', 'pdf', 'rtf', 'txt']))
+        sys.path.insert(0, tmp)
+        lazy = PluginRegistry()
+        lazy.load_manifest(manifest)
+        lazy.discover()             # (none, unless a package declares some)
+        print(lazy.formats(), 'savepdf' in sys.modules)
+        print(lazy.save("report", "pdf"), lazy.save("report", "pdf"))
+        print(lazy.save("report", "xyz"), lazy.loaded)
+        sys.path.remove(tmp)
+
+    # Per-call cost: section 10's save_file() vs. the dispatch dict
+    from timeit import repeat
+    def timeit(func, number=1):     # (best of 3)
+        return min(repeat(func, number=number, repeat=3))
+    n = 1000000
+    formats = ['html', 'pdf', 'rtf', 'txt', 'xyz'] * (n // 5)
+    t = timeit(lambda: [save_file('report', f) for f in formats], number=1)
+    print('new object + getattr: %.0f ns/call' % (t / n * 1e9))
+    plugin = SavePlugin()
+    t = timeit(lambda: [getattr(plugin, 'save_as_' + f, plugin.save_as_txt)
+                        ('report') for f in formats], number=1)
+    print('getattr only:         %.0f ns/call' % (t / n * 1e9))
+    t = timeit(lambda: [registry.save('report', f) for f in formats],
+               number=1)
+    print('registry.save:        %.0f ns/call' % (t / n * 1e9))
+    get = registry.table.get        # (or lookup once, call many times)
+    default = registry.get('txt')
+    t = timeit(lambda: [get(f, default)('report') for f in formats],
+               number=1)
+    print('dict lookup:          %.0f ns/call' % (t / n * 1e9))
+
+
+
+##
+##  END
+##
@@ -0,0 +1,243 @@
+###############################################################################
+##
+##  PYTHON BYTECODE CACHE DEMO -- Copyright Michel Pasquier, 2013-2018
+##
+
+
+## This Python script demo is part of section 10 (Meta-programming).
+## That section notes that modules are compiled once into .pyc files, while
+## code given to exec() as a string is compiled again at every run. Here,
+## snippets (e.g. thousands of user-written rules) are compiled once too:
+## the code objects are saved with the marshal module (the format of .pyc
+## files) in a cache directory. Each file is named after a hash (SHA-256) of
+## the snippet's text, so an edited snippet simply gets a new file, and the
+## files of each Python version are kept apart, under the 'magic number' of
+## its bytecode (bytecode changes between versions). Files are only read
+## when their snippet is first run, and checked (magic number, hash and a
+## checksum in a header) before use: a bad file is compiled and written
+## again. Files are written whole, then renamed, never half-written (the
+## temporary files left by a crash are removed later, when the directory is
+## next scanned). When the cache grows over a given size, the least recently
+## used files go.
+
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+
+MAGIC = importlib.util.MAGIC_NUMBER # 4 bytes, specific to this bytecode
+
+
+class Snippet:
+    """Code given as text, compiled or loaded from the cache on first use."""
+
+    def __init__(self, loader, source, name='<snippet>', mode='exec'):
+        self.loader, self.source, self.name, self.mode = \
+            loader, source, name, mode
+        self.key = loader.key(source, name, mode)
+        self._code = None
+
+    @property
+    def code(self):
+        if self._code is None:
+            self._code = self.loader.code(self)
+        return self._code
+
+    def run(self, namespace=None):
+        """exec() (or eval(), in 'eval' mode) the code in namespace."""
+        if namespace is None: namespace = {}
+        if self.mode == 'eval':
+            return eval(self.code, namespace)
+        exec(self.code, namespace)
+        return namespace
+
+
+class SnippetLoader:
+    """Cache of compiled snippets in a directory, of at most max_bytes."""
+
+    def __init__(self, directory, max_bytes=64 << 20):
+        self.directory = os.path.join(directory, MAGIC.hex())
+        self.max_bytes = max_bytes
+        self.size = None            # total size of the files, once known
+        self.stats = dict.fromkeys(['loaded', 'compiled', 'invalid',
+                                    'evicted', 'stale'], 0)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, source, name='<snippet>', mode='exec'):
+        """Hash of the text, and of what else compile() is given."""
+        h = hashlib.sha256(source.encode('utf-8', 'surrogatepass'))
+        h.update(('\0%s\0%s\0%d' % (name, mode, sys.flags.optimize)).encode(
+                 'utf-8', 'surrogatepass'))
+        return h.digest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key.hex() + '.bin')
+
+    def snippet(self, source, name='<snippet>', mode='exec'):
+        return Snippet(self, source, name, mode)
+
+    def code(self, snippet):
+        """Returns the code of snippet, from its file if valid, otherwise
+        compiled (and saved)."""
+        path = self.path(snippet.key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        if data is not None:
+            # header: magic number, key, and checksum of the marshal data
+            code = None
+            if data[:4] == MAGIC and data[4:36] == snippet.key and \
+               data[36:40] == zlib.crc32(data[40:]).to_bytes(4, 'little'):
+                try:
+                    code = marshal.loads(memoryview(data)[40:])
+                except (EOFError, ValueError, TypeError):
+                    pass
+            if code is not None:
+                self.stats['loaded'] += 1
+                try:
+                    os.utime(path)  # most recently used
+                except OSError:     # (just evicted by another process)
+                    pass
+                return code
+            self.stats['invalid'] += 1
+        code = compile(snippet.source, snippet.name, snippet.mode)
+        self.stats['compiled'] += 1
+        data, old = marshal.dumps(code), data
+        self._save(path, MAGIC + snippet.key +
+                   zlib.crc32(data).to_bytes(4, 'little') + data,
+                   len(old) if old is not None else 0)
+        return code
+
+    def _save(self, path, data, replaced=0):
+        # write to a temporary file, then rename: other processes never see
+        # a half-written file (and os.replace is atomic)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:             # (e.g. disk full: the cache is optional)
+            if os.path.exists(tmp): os.remove(tmp)
+            return
+        if self.size is None:
+            self.size = self.total_size()
+        else:
+            self.size += len(data) - replaced
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def _entries(self, stale=3600):
+        """Returns the (mtime, size, path) of the files in the cache; also
+        removes the temporary files older than stale seconds (left by a
+        crash: younger ones may be being written by another process)."""
+        entries, now = [], time.time()
+        with os.scandir(self.directory) as it:
+            for e in it:
+                try:
+                    st = e.stat()
+                except OSError:     # (removed meanwhile)
+                    continue
+                if e.name.endswith('.bin'):
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                elif e.name.endswith('.tmp') and now - st.st_mtime > stale:
+                    try:
+                        os.remove(e.path)
+                        self.stats['stale'] += 1
+                    except OSError:
+                        pass
+        return entries
+
+    def total_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target=0.8):
+        """Removes the least recently used files until the cache is under
+        target times max_bytes."""
+        entries = sorted(self._entries())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_bytes * target: break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+            self.stats['evicted'] += 1
+
+
+
+if __name__ == '__main__':
+
+    import shutil
+    from time import perf_counter
+
+    # 3000 rules, as user-written text
+    rules = ['''
+def rule_%d(order):
+    """Discount rule %d."""
+    total = sum(item['price'] * item['qty'] for item in order['items'])
+    if order['country'] in ('SG', 'MY', 'ID') and total > %d:
+        return round(total * 0.%02d, 2)
+    elif any(item['qty'] > %d for item in order['items']):
+        return min(total, %d) / 10
+    return 0.0
+''' % (i, i, i * 7 % 500, i % 90 + 10, i % 9 + 1, i * 3 % 1000)
+             for i in range(3000)]
+    order = {'country': 'SG', 'items': [{'price': 20.0, 'qty': 3},
+                                        {'price': 5.5, 'qty': 12}]}
+    directory = tempfile.mkdtemp()
+
+    def start_up():                 # what a program does when it starts
+        loader = SnippetLoader(directory)
+        snippets = [loader.snippet(source, 'rule%d' % i)
+                    for i, source in enumerate(rules)]
+        namespace = {}
+        for snippet in snippets:
+            snippet.run(namespace)
+        return loader, namespace
+
+    t = perf_counter()
+    namespace = {}
+    for i, source in enumerate(rules):
+        exec(source, namespace)
+    print('exec(text):  %.3fs' % (perf_counter() - t))
+    for run in ['cold', 'warm']:
+        t = perf_counter()
+        loader, namespace = start_up()
+        print('%s cache:  %.3fs' % (run, perf_counter() - t), loader.stats)
+    print(namespace['rule_42'](order), namespace['rule_2999'](order))
+
+    # A corrupted file is detected, then compiled and written again
+    snippet = loader.snippet(rules[0], 'rule0')
+    with open(loader.path(snippet.key), 'r+b') as f:
+        f.seek(40)
+        f.write(b'garbage')
+    loader.snippet(rules[0], 'rule0').run()
+    print(loader.stats)
+
+    # Over the size limit, the least recently used files are removed
+    small = SnippetLoader(directory, max_bytes=loader.total_size() // 2)
+    small.snippet('x = 1').run()
+    print(small.stats, small.total_size() <= small.max_bytes)
+
+    # A temporary file left by a crash is removed once it is old enough
+    fd, tmp = tempfile.mkstemp(dir=small.directory, suffix='.tmp')
+    os.close(fd)
+    os.utime(tmp, (time.time() - 7200,) * 2)
+    small.total_size()
+    print(small.stats['stale'], os.path.exists(tmp))
+    shutil.rmtree(directory)
+
+
+
+##
+##  END
+##